@@ -0,0 +1,108 @@
+# amser_cleciadur.py
+'''
+Amser ymholiadau /cleciadur: `clec_search()` yn sganio (fel cynt) o'i
+gymharu â `mynegai_clecs` (adeiladu'r mynegai unwaith, ymholiadau oer
+heb y storfa, ac yna o'r storfa), ar gyfer set sefydlog o ymholiadau.
+Mae'r un peth ar gael i /odliadur (`mynegai_odlau`) gydag `--odliadur`.
+Rhaid cael GEIRIADUR_FFEIL i fesur y mynegai.
+
+    GEIRIADUR_FFEIL=geiriadur.txt python benchmarks/amser_cleciadur.py --nifer 5
+    python benchmarks/amser_cleciadur.py --odliadur
+'''
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ceibwr.cleciadur import clec_search
+from ceibwr.odliadur import odl_search
+
+from ceibwrapp import mynegai_clecs
+from ceibwrapp import mynegai_odlau
+
+
+YMHOLIADAU = [
+    'cân',
+    'calon',
+    'haul',
+    'rhod',
+    'hynod',
+    'darfod',
+    'mynydd',
+    'cariad',
+    'tawel',
+    'ymyl rhod',
+]
+
+SILLAFAU = [
+    'an',
+    'ân',
+    'ed',
+    'od',
+    'ydd',
+    'aid',
+    'on',
+    'wyn',
+    'el',
+    'au',
+]
+
+
+def amseru(ffwythiant, ymholiadau, nifer):
+    # canolrif (ms) i bob ymholiad ar draws `nifer` rownd
+    amserau = []
+    for _ in range(nifer):
+        for ymholiad in ymholiadau:
+            t0 = time.perf_counter()
+            ffwythiant(ymholiad)
+            amserau.append(time.perf_counter() - t0)
+    return 1000*statistics.median(amserau), 1000*max(amserau)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--nifer', type=int, default=3, help='rowndiau')
+    parser.add_argument('--odliadur', action='store_true')
+    args = parser.parse_args()
+
+    if args.odliadur:
+        ymholiadau = SILLAFAU
+        cynt = odl_search
+        adeiladu = mynegai_odlau.mynegai
+        newydd = mynegai_odlau.chwilio
+        storfa = mynegai_odlau.storfa
+    else:
+        ymholiadau = YMHOLIADAU
+        cynt = clec_search
+        adeiladu = mynegai_clecs.mynegai
+        newydd = mynegai_clecs.chwilio
+        storfa = mynegai_clecs.storfa
+
+    def oer(ymholiad):
+        storfa.clear()
+        return newydd(ymholiad)
+
+    print('{:<16} {:>10} {:>10}'.format('', 'canolrif', 'uchafswm'))
+
+    canolrif, uchafswm = amseru(cynt, ymholiadau, args.nifer)
+    print('{:<16} {:>7.2f} ms {:>7.2f} ms'.format('cynt (sganio)', canolrif, uchafswm))
+
+    if adeiladu:
+        t0 = time.perf_counter()
+        adeiladu()
+        print('{:<16} {:>7.2f} ms (unwaith)'.format('adeiladu', 1000*(time.perf_counter() - t0)))
+
+    canolrif, uchafswm = amseru(oer, ymholiadau, args.nifer)
+    print('{:<16} {:>7.2f} ms {:>7.2f} ms'.format('mynegai (oer)', canolrif, uchafswm))
+
+    storfa.clear()
+    amseru(newydd, ymholiadau, 1)
+    canolrif, uchafswm = amseru(newydd, ymholiadau, args.nifer)
+    print('{:<16} {:>7.2f} ms {:>7.2f} ms'.format('storfa', canolrif, uchafswm))
+
+if __name__ == '__main__':
+    main()
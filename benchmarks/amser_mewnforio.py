@@ -0,0 +1,69 @@
+# amser_mewnforio.py
+'''
+Amser mewnforio modiwlau'r ap, pob un mewn proses Python newydd (fel
+gweithiwr gunicorn yn cychwyn). Mae'n dangos y canolrif o `--nifer`
+rhediad ac a gafodd matplotlib/geomstats eu llwytho.
+
+    python benchmarks/amser_mewnforio.py
+    python benchmarks/amser_mewnforio.py --rhaglwytho ceibwrapp.app
+'''
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+
+PROJECT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODIWLAU = [
+    'ceibwrapp.celfi',
+    'ceibwrapp.oriel',
+    'ceibwrapp.app',
+    'ceibwrapp.darlun',
+]
+
+TRWM = ['matplotlib', 'geomstats']
+
+SGRIPT = '''
+import sys, time, json
+t0 = time.perf_counter()
+import {modiwl}
+dt = time.perf_counter() - t0
+print(json.dumps({{'amser': dt, 'trwm': [m for m in {trwm!r} if m in sys.modules]}}))
+'''
+
+
+def mesur(modiwl, env):
+    sgript = SGRIPT.format(modiwl=modiwl, trwm=TRWM)
+    allbwn = subprocess.run(
+        [sys.executable, '-c', sgript],
+        cwd=PROJECT_FOLDER, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    # y llinell olaf (gall yr ap argraffu pethau wrth gychwyn)
+    return json.loads(allbwn.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('modiwlau', nargs='*', default=MODIWLAU)
+    parser.add_argument('--nifer', type=int, default=5)
+    parser.add_argument('--rhaglwytho', action='store_true', help='DARLUN_RHAGLWYTHO=1')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env['PEIRIANNAU_CYNHESU'] = env.get('PEIRIANNAU_CYNHESU', '0')
+    env['DARLUN_RHAGLWYTHO'] = '1' if args.rhaglwytho else '0'
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [PROJECT_FOLDER, env.get('PYTHONPATH')]))
+
+    for modiwl in args.modiwlau:
+        canlyniadau = [mesur(modiwl, env) for _ in range(args.nifer)]
+        amser = statistics.median(c['amser'] for c in canlyniadau)
+        trwm = ', '.join(canlyniadau[-1]['trwm']) or '-'
+        print('{:<20} {:>8.1f} ms   {}'.format(modiwl, 1000*amser, trwm))
+
+
+if __name__ == '__main__':
+    main()
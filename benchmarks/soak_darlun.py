@@ -0,0 +1,82 @@
+# soak_darlun.py
+'''
+Prawf socian ar gyfer `darlun.plot`: darlunio'r un datrysiad `--nifer`
+gwaith (i `BytesIO`, mewn `--edafedd` edefyn) a chofnodi'r RSS. Dylai'r
+cof aros yn wastad ar ôl y cynhesu; mae'r sgript yn methu (cod 1) os yw'r
+RSS yn tyfu mwy na `--goddefiad` MB rhwng diwedd y cynhesu (10%) a'r
+diwedd.
+
+    python benchmarks/soak_darlun.py --nifer 10000 --edafedd 4
+'''
+
+import io
+import os
+import sys
+import time
+import argparse
+import resource
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ceibwrapp.darlun import plot
+from ceibwrapp.peiriannau import peiriant
+
+
+ENGHRAIFFT = """Wele rith fel ymyl rhod - o'n cwmpas
+Campwaith dewin hynod.
+Hen linell bell nad yw'n bod
+Hen derfyn nad yw'n darfod."""
+
+
+def rss():
+    # MB (RSS cyfredol os oes /proc, neu'r uchafswm)
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1])*os.sysconf('SC_PAGE_SIZE')/2**20
+    except OSError:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss/2**20 if sys.platform == 'darwin' else maxrss/2**10
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--nifer', type=int, default=10000)
+    parser.add_argument('--edafedd', type=int, default=1)
+    parser.add_argument('--hyperbolic', action='store_true')
+    parser.add_argument('--fformat', default='svg')
+    parser.add_argument('--goddefiad', type=float, default=20.0, help='MB')
+    args = parser.parse_args()
+
+    with peiriant() as pe:
+        meta, uned = pe.parse(ENGHRAIFFT)
+        dat = pe.datryswr(uned)
+        dat.set_nbrs()
+
+    ndots = 100 if args.hyperbolic else 500
+
+    def darlunio(_):
+        allbwn = io.BytesIO()
+        plot(dat, hyperbolic=args.hyperbolic, ndots=ndots, allbwn=allbwn, fformat=args.fformat)
+        return len(allbwn.getvalue())
+
+    cynhesu = max(args.nifer//10, 1)
+    cam = max(args.nifer//20, 1)
+    rss_cynhesu = None
+    t0 = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=args.edafedd) as pool:
+        for idx, _ in enumerate(pool.map(darlunio, range(args.nifer)), start=1):
+            if idx == cynhesu:
+                rss_cynhesu = rss()
+            if idx % cam == 0 or idx == args.nifer:
+                dt = time.perf_counter() - t0
+                print('{:>7} {:>9.1f} MB {:>8.2f} ms/darlun'.format(idx, rss(), 1000*dt/idx), flush=True)
+
+    twf = rss() - rss_cynhesu
+    print('twf ar ôl cynhesu: {:.1f} MB (goddefiad {:.1f} MB)'.format(twf, args.goddefiad))
+    return 0 if twf <= args.goddefiad else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
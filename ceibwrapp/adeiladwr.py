@@ -0,0 +1,180 @@
+# adeiladwr.py
+'''
+Adeiladu'r mefus yn y cefndir.
+
+Mae edefyn yn gwylio CERDDI_FOLDER ac yn galw `create_mefus()` pan fo
+rhywbeth yn newid, fel nad oes rhaid i ymwelwyr (na'r gweinydd wrth
+gychwyn) aros. Mae `/mefus` yn cael y set gyflawn ddiwethaf o
+`manifest()` bob tro. Mae hen allbynnau'n cael eu dileu (`tacluso`) ar
+ôl y cyfnewid, unwaith mae'r prosesau eraill wedi cael amser i newid
+hefyd.
+'''
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+
+from .celfi import create_mefus, read_manifest, llofnod_cerddi, tacluso
+from .settings import MEFUS_FOLDER, MEFUS_MANIFEST, MEFUS_CYFNOD
+
+
+_lock = threading.Lock()
+_edefyn = None
+
+# y set gyflawn ddiwethaf
+_manifest = None
+_manifest_mtime = None
+
+_statws = {
+    'rhedeg': False,
+    'wedi': 0,
+    'cyfanswm': 0,
+    'cyfredol': None,
+    'dechrau': None,
+    'gorffen': None,
+    'gwallau': [],
+}
+
+
+def manifest():
+    '''
+    Y manifest cyflawn diwethaf (slug: {ffynhonnell, hash, ceibwr, allbwn}).
+    '''
+    if _manifest is None:
+        _llwytho_manifest()
+    return _manifest
+
+
+def _llwytho_manifest():
+    global _manifest, _manifest_mtime
+    try:
+        mtime = os.path.getmtime(MEFUS_MANIFEST)
+    except OSError:
+        mtime = None
+    _manifest = read_manifest()
+    _manifest_mtime = mtime
+
+
+def _cynnydd(wedi, cyfanswm, ffynhonnell, gwall):
+    with _lock:
+        _statws['wedi'] = wedi
+        _statws['cyfanswm'] = cyfanswm
+        _statws['cyfredol'] = ffynhonnell
+        if gwall:
+            _statws['gwallau'].append((ffynhonnell, gwall))
+
+
+@contextmanager
+def _clo():
+    # clo ar ffeil yn MEFUS_FOLDER (rhwng prosesau); `False` os yw gan rywun arall
+    os.makedirs(MEFUS_FOLDER, exist_ok=True)
+    with open(os.path.join(MEFUS_FOLDER, '.lock'), 'w') as clo:
+        if fcntl:
+            try:
+                fcntl.flock(clo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                yield False
+                return
+        yield True
+
+
+def adeiladu(llawn=False):
+    '''
+    Un rhediad o `create_mefus()`. Dim ond un broses sy'n adeiladu ar y
+    tro (clo ar ffeil yn MEFUS_FOLDER); mae'r lleill yn dychwelyd `False`.
+    '''
+    global _manifest, _manifest_mtime
+
+    with _clo() as gennym:
+        if not gennym:
+            return False
+
+        with _lock:
+            _statws.update({
+                'rhedeg': True,
+                'wedi': 0,
+                'cyfanswm': 0,
+                'cyfredol': None,
+                'dechrau': time.time(),
+                'gwallau': [],
+            })
+
+        try:
+            manifest = create_mefus(llawn=llawn, cynnydd=_cynnydd)
+        finally:
+            with _lock:
+                _statws['rhedeg'] = False
+                _statws['cyfredol'] = None
+
+        # cyfnewid
+        with _lock:
+            _manifest = manifest
+            _manifest_mtime = os.path.getmtime(MEFUS_MANIFEST) if os.path.exists(MEFUS_MANIFEST) else None
+            _statws['gorffen'] = time.time()
+
+        # dim ond ar ôl cyfnewid
+        tacluso(manifest)
+
+    return True
+
+
+def _tacluso():
+    # dileu hen allbynnau sydd wedi bod yn amddifad ers MEFUS_CADW
+    with _clo() as gennym:
+        if gennym:
+            tacluso(read_manifest())
+
+
+def _gwylio():
+    llofnod = None
+    while True:
+        try:
+            newydd = llofnod_cerddi()
+            if newydd != llofnod:
+                if adeiladu():
+                    llofnod = newydd
+
+            # proses arall wedi adeiladu?
+            elif os.path.exists(MEFUS_MANIFEST) and os.path.getmtime(MEFUS_MANIFEST) != _manifest_mtime:
+                with _lock:
+                    _llwytho_manifest()
+
+            _tacluso()
+
+        except Exception as err:
+            print('ADEILADWR:', type(err).__name__, err)
+
+        time.sleep(MEFUS_CYFNOD)
+
+
+def cychwyn():
+    '''
+    Cychwyn yr edefyn gwylio (unwaith i bob proses).
+    '''
+    global _edefyn
+    with _lock:
+        if _edefyn is not None:
+            return
+        _edefyn = threading.Thread(target=_gwylio, name='adeiladwr-mefus', daemon=True)
+        _edefyn.start()
+
+
+def statws():
+    '''
+    Cynnydd yr adeiladu ac oed y data.
+    '''
+    with _lock:
+        statws = dict(_statws)
+        statws['gwallau'] = list(_statws['gwallau'])
+        diweddarwyd = statws['gorffen'] or _manifest_mtime
+
+    statws['cerddi'] = len(manifest())
+    statws['diweddarwyd'] = diweddarwyd
+    statws['oed'] = time.time() - diweddarwyd if diweddarwyd else None
+    return statws
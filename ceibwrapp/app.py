@@ -2,21 +2,23 @@
 '''Flask web server.'''
 
 import os
+import json
+import math
+import base64
+import queue
 import time
+import threading
 
-from flask import Flask, render_template, request, url_for
-from flask import flash, redirect
+from flask import Flask, render_template, request, url_for, jsonify
+from flask import flash, redirect, send_file, send_from_directory, abort
+from flask import Response, stream_with_context, stream_template
 from werkzeug.utils import secure_filename
 
 from pathlib import Path
 
-from ceibwr.peiriant import Peiriant
 from ceibwr.beiro import Beiro
 from ceibwr.cysonion import llythrenwau
 
-from ceibwr.odliadur import odl_search
-from ceibwr.cleciadur import clec_search
-
 from ceibwr.mesur import Mesur
 from ceibwr.cynghanedd import Llusg
 
@@ -31,13 +33,34 @@ from ceibwr.nod import Nod, Cytsain, Bwlch, EOL
 
 
 # from . import sbwriel
-from ceibwrapp.celfi import create_cerddi_dict
-from ceibwrapp.celfi import create_mefus
-from ceibwrapp.darlun import plot
+from ceibwrapp.celfi import cerddi_dict, load_cryno, AMGODIADAU
+from ceibwrapp import adeiladwr
+from ceibwrapp.storfa import StorfaLRU, normaleiddio
+from ceibwrapp.peiriannau import peiriant
+from ceibwrapp import peiriannau
+from ceibwrapp import gweithwyr
+from ceibwrapp import tasgau
+from ceibwrapp import oriel
+from ceibwrapp import cryno
+from ceibwrapp import mynegai_odlau
+from ceibwrapp import mynegai_clecs
+from ceibwrapp import corpws
+from ceibwrapp import colofnau
+from ceibwrapp import cyfrifon
 
 from ceibwrapp.settings import (
-    CERDDI_FOLDER,
     MEFUS_FOLDER,
+    DATRYS_STORFA_MAINT,
+    DATRYS_STORFA_TTL,
+    CERDDI_STORFA_MAINT,
+    PEIRIANNAU_CYNHESU,
+    API_TERFYN,
+    API_UCHAFSWM,
+    DARLUN_MODD,
+    DARLUN_RHAGLWYTHO,
+    ODLIADUR_TUDALEN,
+    CLECIADUR_TERFYN,
+    CORPWS_TERFYN,
 )
 
 app = Flask(__name__)
@@ -85,25 +108,21 @@ app.secret_key = os.urandom(24)
 # UPLOAD_FOLDER = url_for('static', filename='uploads/')
 
 
-def refresh_mefus():
-    mefus_files = [os.path.join(path, name) for path, subdirs, files in os.walk(MEFUS_FOLDER) for name in files]
-    cerddi_files = [os.path.join(path, name) for path, subdirs, files in os.walk(CERDDI_FOLDER) for name in files]
-
-    mefus_time = max(os.path.getmtime(f) for f in mefus_files)
-    cerddi_time = max(os.path.getmtime(f) for f in cerddi_files)
-    
-    print(mefus_time)
-    print(cerddi_time)
-    print(mefus_time < cerddi_time)
+# init: cynhesu peiriant (i'r defnyddiwr cyntaf) ac adeiladu mefus yn y cefndir
+peiriannau.cynhesu(PEIRIANNAU_CYNHESU)
+adeiladwr.cychwyn()
 
-    if mefus_time < cerddi_time:
-        print('REFRESHING MEFUS')
-        create_mefus()
+# mae `darlun` (matplotlib, geomstats) yn cael ei fewnforio y tro cyntaf
+# mae /darlunio yn ei ddefnyddio, oni bai bod DARLUN_RHAGLWYTHO
+if DARLUN_RHAGLWYTHO:
+    from ceibwrapp.darlun import rhaglwytho
+    rhaglwytho()
 
+# storfa datrysiadau /datrys
+storfa_datrys = StorfaLRU(maint=DATRYS_STORFA_MAINT, ttl=DATRYS_STORFA_TTL)
 
-# init
-with app.app_context():
-    refresh_mefus()
+# storfa cerddi /cerddi/<slug> (o mefus, dim datrys)
+storfa_cerddi = StorfaLRU(maint=CERDDI_STORFA_MAINT, ttl=None)
 
 
 # filters
@@ -114,74 +133,78 @@ def reverse_filter(s):
 
 # -------------------------
 # tests for type checking
+# (gwrthrychau ceibwr, neu rai `cryno` sy'n cofio eu dosbarthiadau)
+def _yn(value, cls):
+    return isinstance(value, cls) or cryno.yn(value, cls.__name__)
+
 @app.template_test('mesur')
 def is_mesur(value):
-    return isinstance(value, Mesur)
+    return _yn(value, Mesur)
 
 
 @app.template_test('llusg')
 def is_llusg(value):
-    return isinstance(value, Llusg)
+    return _yn(value, Llusg)
 
 
 @app.template_test('cerdd')
 def is_cerdd(value):
-    return isinstance(value, Cerdd)
+    return _yn(value, Cerdd)
 
 
 @app.template_test('pennill')
 def is_pennill(value):
-    return isinstance(value, Pennill)
+    return _yn(value, Pennill)
 
 
 @app.template_test('llinell')
 def is_llinell(value):
-    return isinstance(value, Llinell)
+    return _yn(value, Llinell)
 
 
 @app.template_test('rhaniad')
 def is_rhaniad(value):
-    return isinstance(value, Rhaniad)
+    return _yn(value, Rhaniad)
 
 
 @app.template_test('corfan')
 def is_corfan(value):
-    return isinstance(value, Corfan)
+    return _yn(value, Corfan)
 
 
 @app.template_test('gair')
 def is_gair(value):
-    return isinstance(value, Gair)
+    return _yn(value, Gair)
 
 
 @app.template_test('sillaf')
 def is_sillaf(value):
-    return isinstance(value, Sillaf)
+    return _yn(value, Sillaf)
 
 
 @app.template_test('odl')
 def is_odl(value):
-    return isinstance(value, Odl)
+    return _yn(value, Odl)
 
 
 @app.template_test('cytsain')
 def is_cytsain(value):
-    return isinstance(value, Cytsain)
+    return _yn(value, Cytsain)
 
 
 @app.template_test('nod')
 def is_nod(value):
-    return isinstance(value, Nod)
+    return _yn(value, Nod)
 
 
 @app.template_test('bwlch')
 def is_bwlch(value):
-    return isinstance(value, Bwlch)
+    return _yn(value, Bwlch)
 
 
 @app.template_test('eol')
 def is_eol(value):
-    return isinstance(value, EOL)
+    return _yn(value, EOL)
 
 # -------------------------
 # routes
@@ -205,20 +228,37 @@ def odliadur():
         llusg_opt = request.form.get('llusg')
         llusg = True if llusg_opt else False
 
-        # chwilio
-        odlau = odl_search(sillaf, acennog=acennog, llusg=llusg)
-
-        # allbwn
-        context = {}
-        context['odlau'] = ' '.join(odlau)
-        context['acennog'] = acennog
-        context['llusg'] = llusg
+        # chwilio (y dudalen gyntaf; mae'r gweddill yn dod o /api/odliadur)
+        context = mynegai_odlau.tudalen(sillaf, acennog=acennog, llusg=llusg)
 
         return render_template('odliadur.html', context=context)
 
     return render_template('odliadur.html', context=None)
 
 
+@app.route('/api/odliadur')
+def api_odliadur():
+    '''
+    Odlau fel JSON, fesul tudalen:
+
+        /api/odliadur?sillaf=an&acennog=1&llusg=0&tudalen=2&maint=200
+    '''
+    sillaf = request.args.get('sillaf', '')
+    if not sillaf.strip():
+        return jsonify({'gwall': 'dim sillaf'}), 400
+
+    try:
+        rhif = int(request.args.get('tudalen', 1))
+        maint = int(request.args.get('maint', ODLIADUR_TUDALEN))
+    except ValueError:
+        return jsonify({'gwall': 'tudalen/maint annilys'}), 400
+
+    acennog = request.args.get('acennog', '0') not in ('', '0', 'false')
+    llusg = request.args.get('llusg', '0') not in ('', '0', 'false')
+
+    return jsonify(mynegai_odlau.tudalen(sillaf, acennog=acennog, llusg=llusg, rhif=rhif, maint=maint))
+
+
 @app.route('/cleciadur', methods=('GET', 'POST'))
 def cleciadur():
     if request.method == 'POST':
@@ -227,12 +267,8 @@ def cleciadur():
         if not ymholiad:
             return render_template('cleciadur.html', context=None)
 
-        # chwilio
-        clecs = clec_search(ymholiad)
-
-        # allbwn
-        context = {}
-        context['clecs'] = clecs
+        # chwilio (y `CLECIADUR_TERFYN` cyntaf; mae'r gweddill yn dod o /api/cleciadur)
+        context = mynegai_clecs.crynodeb(ymholiad)
         context['llythrenwau'] = llythrenwau['aceniad']
 
         return render_template('cleciadur.html', context=context)
@@ -240,15 +276,35 @@ def cleciadur():
     return render_template('cleciadur.html', context=None)
 
 
-@app.route('/datrys', methods=('GET', 'POST'))
-def datrys():
-    if request.method == 'POST':
-        s = request.form['mewnbwn']
+@app.route('/api/cleciadur')
+def api_cleciadur():
+    '''
+    Geiriau un dosbarth fel JSON, fesul tudalen:
 
-        if not s:
-            return render_template('datrys.html', context=None)
+        /api/cleciadur?ymholiad=...&dosbarth=CAC&tudalen=2&maint=100
+    '''
+    ymholiad = request.args.get('ymholiad', '')
+    if not ymholiad.strip():
+        return jsonify({'gwall': 'dim ymholiad'}), 400
+
+    dosbarth = request.args.get('dosbarth', '')
+    if dosbarth not in mynegai_clecs.DOSBARTHIADAU:
+        return jsonify({'gwall': 'dosbarth annilys: {}'.format(dosbarth)}), 400
 
-        pe = Peiriant()
+    try:
+        rhif = int(request.args.get('tudalen', 1))
+        maint = int(request.args.get('maint', CLECIADUR_TERFYN))
+    except ValueError:
+        return jsonify({'gwall': 'tudalen/maint annilys'}), 400
+
+    return jsonify(mynegai_clecs.tudalen(ymholiad, dosbarth, rhif=rhif, maint=maint))
+
+
+def datrys_context(s):
+    '''
+    Datrys `s` a chreu'r `context` ar gyfer `datrys.html`.
+    '''
+    with peiriant() as pe:
 
         uned = s
         if type(s) is str:
@@ -262,75 +318,253 @@ def datrys():
 
         dat = pe.datryswr(uned, unigol=True)
         dat.set_nbrs()  # dyle hwn prob. fod yn "datryswr"
-        print('Datrysiad:', repr(dat))
 
-        # console
-        if not dat.dosbarth:
-            beiro = Beiro()
-            print(beiro.magenta('XXX'))
+    print('Datrysiad:', repr(dat))
 
-        # create xml docs
-        xml_text = uned.xml_str()
-        xml_sain = dat.xml_str()
+    # console
+    if not dat.dosbarth:
+        beiro = Beiro()
+        print(beiro.magenta('XXX'))
 
-        # context
-        context = {}
-        context['smap'] = smap
-        context['cmap'] = cmap
-        context['meta'] = meta
-        context['uned'] = uned
-        context['datrysiad'] = dat
-        context['xml_text'] = xml_text
-        context['xml_sain'] = xml_sain
-        context['llythrenwau'] = llythrenwau['cynghanedd'] | llythrenwau['aceniad'] | llythrenwau['cwpled'] | llythrenwau['mesur']
-
-        # maps 
-        # acenion: `Llafariad`: prifacen|isacen
-        context['acenion'] = dat.cyfuno_acenion()
-        # cytseinedd: `Cytsain`: GEF|TRA|CYS|GWG|etc.
-        context['odlau'] = dat.cyfuno_odlau()
-        # odlau: `Odl`: ODF|ODG|ODL
-        context['cytseinedd'] = dat.cyfuno_cytseinedd()
-        
+    # create xml docs
+    xml_text = uned.xml_str()
+    xml_sain = dat.xml_str()
+
+    return _context(meta, uned, dat, xml_text, xml_sain)
+
+
+def _context(meta, uned, dat, xml_text=None, xml_sain=None):
+    '''
+    `context` ar gyfer `datrys.html` o ddatrysiad (un newydd, neu un
+    `cryno` o mefus).
+    '''
+    context = {}
+    context['smap'] = smap
+    context['cmap'] = cmap
+    context['meta'] = meta
+    context['uned'] = uned
+    context['datrysiad'] = dat
+    context['xml_text'] = xml_text
+    context['xml_sain'] = xml_sain
+    context['llythrenwau'] = llythrenwau['cynghanedd'] | llythrenwau['aceniad'] | llythrenwau['cwpled'] | llythrenwau['mesur']
+
+    # maps 
+    # acenion: `Llafariad`: prifacen|isacen
+    context['acenion'] = dat.cyfuno_acenion()
+    # cytseinedd: `Cytsain`: GEF|TRA|CYS|GWG|etc.
+    context['odlau'] = dat.cyfuno_odlau()
+    # odlau: `Odl`: ODF|ODG|ODL
+    context['cytseinedd'] = dat.cyfuno_cytseinedd()
+
+    return context
+
+
+def _datrys_html(storfa, allwedd, creu):
+    '''
+    `datrys.html` ar gyfer y context yn `storfa` (neu un newydd o `creu()`).
+    Mae `tabl.html` yn symud nodau dros dro (TOB), felly un ar y tro i bob
+    eitem.
+    '''
+    eitem = storfa.get(allwedd)
+    if eitem is None:
+        eitem = (creu(), threading.Lock())
+        storfa.set(allwedd, eitem)
+
+    context, lock = eitem
+    with lock:
         return render_template('datrys.html', context=context, scroll='datrysiad')
 
+
+@app.route('/datrys', methods=('GET', 'POST'))
+def datrys():
+    if request.method == 'POST':
+        s = request.form['mewnbwn']
+
+        if not s:
+            return render_template('datrys.html', context=None)
+
+        # allwedd: testun heb ofod gwyn ychwanegol
+        return _datrys_html(storfa_datrys, normaleiddio(s), lambda: datrys_context(s))
+
     return render_template('datrys.html', context=None)
 
 
+@app.route('/api/datrys', methods=('POST',))
+def api_datrys():
+    '''
+    Datrys swp o linellau/cerddi.
+
+    Mewnbwn (JSON): {"mewnbwn": [s1, s2, ...], "xml": false, "cryno": false, "terfyn": 10}
+    Allbwn (NDJSON): un gwrthrych i bob eitem wrth iddi orffen, gyda
+    `idx` (safle yn `mewnbwn`) a naill ai `gwall` neu ganlyniad
+    `gweithwyr.datrys_json`.
+    '''
+    data = request.get_json(silent=True)
+    if isinstance(data, list):
+        data = {'mewnbwn': data}
+    if not isinstance(data, dict) or not isinstance(data.get('mewnbwn'), list):
+        return jsonify({'gwall': 'disgwyl {"mewnbwn": [...]}'}), 400
+
+    mewnbwn = data['mewnbwn']
+    if len(mewnbwn) > API_UCHAFSWM:
+        return jsonify({'gwall': 'uchafswm {} eitem'.format(API_UCHAFSWM)}), 413
+    if not all(isinstance(s, str) for s in mewnbwn):
+        return jsonify({'gwall': 'rhaid i bob eitem fod yn llinyn'}), 400
+
+    xml = bool(data.get('xml'))
+    gyda_cryno = bool(data.get('cryno'))
+    try:
+        terfyn = float(data.get('terfyn', API_TERFYN))
+    except (TypeError, ValueError):
+        terfyn = None
+    if terfyn is None or not math.isfinite(terfyn) or not 0 < terfyn <= API_TERFYN:
+        return jsonify({'gwall': 'terfyn annilys: rhaid bod 0 < terfyn <= {}'.format(API_TERFYN)}), 400
+
+    def ffrwd():
+        swp = gweithwyr.swp(gweithwyr.datrys_json, mewnbwn, terfyn=terfyn, xml=xml, cryno=gyda_cryno)
+        for idx, canlyniad, gwall in swp:
+            llinell = {'idx': idx, 'mewnbwn': mewnbwn[idx]}
+            if gwall:
+                llinell['gwall'] = gwall
+            else:
+                llinell.update(canlyniad)
+            yield json.dumps(llinell, ensure_ascii=False, default=str) + '\n'
+
+    return Response(stream_with_context(ffrwd()), mimetype='application/x-ndjson')
+
+
+def _int(value, default, isaf, uchaf):
+    try:
+        return min(max(int(value), isaf), uchaf)
+    except (TypeError, ValueError):
+        return default
+
+
+@app.route('/tasgau', methods=('POST',))
+def tasg_newydd():
+    '''
+    Cyflwyno tasg hir. Mewnbwn (JSON):
+        {"math": "datrys", "mewnbwn": s, "xml": false, "cryno": false}
+        {"math": "pysgota", "mewnbwn": s, "min_sillafau": 4, "max_sillafau": 8}
+        {"math": "darlunio", "mewnbwn": s, "dtype": "hyperbolic"}
+    Allbwn: 202 {"id": ...}, neu 503 os yw'r ciw yn llawn.
+    '''
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('mewnbwn'), str) or not data['mewnbwn']:
+        return jsonify({'gwall': 'disgwyl {"math": ..., "mewnbwn": "..."}'}), 400
+
+    math_tasg = data.get('math')
+    s = data['mewnbwn']
+    if math_tasg == 'datrys':
+        kwargs = {'xml': bool(data.get('xml')), 'cryno': bool(data.get('cryno'))}
+    elif math_tasg == 'pysgota':
+        min_sillafau = _int(data.get('min_sillafau'), 4, 1, 20)
+        max_sillafau = _int(data.get('max_sillafau'), 8, min_sillafau, 20)
+        kwargs = {'min_sillafau': min_sillafau, 'max_sillafau': max_sillafau}
+    elif math_tasg == 'darlunio':
+        kwargs = {'dtype': 'complex' if data.get('dtype') == 'complex' else 'hyperbolic'}
+    else:
+        return jsonify({'gwall': 'math anhysbys: {}'.format(math_tasg)}), 400
+
+    try:
+        tid = tasgau.cyflwyno(math_tasg, s, **kwargs)
+    except queue.Full:
+        res = jsonify({'gwall': 'ciw yn llawn'})
+        res.status_code = 503
+        res.headers['Retry-After'] = '5'
+        return res
+
+    res = jsonify({'id': tid, 'url': url_for('tasg', tid=tid)})
+    res.status_code = 202
+    res.headers['Location'] = url_for('tasg', tid=tid)
+    return res
+
+
+def _tasg_json(tasg):
+    if tasg['math'] == 'darlunio' and tasg['canlyniad']:
+        canlyniad = dict(tasg['canlyniad'])
+        fname = canlyniad['ffeil']
+        if 'data' in canlyniad:
+            # modd 'cof': mae'r darlun yn y canlyniad ei hun, gan nad yw
+            # storfa un broses ar gael i'r lleill
+            canlyniad['img_file'] = oriel.data_uri(fname, base64.b64decode(canlyniad.pop('data')))
+        else:
+            canlyniad['img_file'] = url_for('static', filename='tmp/{}'.format(fname))
+        tasg['canlyniad'] = canlyniad
+    return tasg
+
+
+@app.route('/tasgau/<tid>', methods=('GET', 'DELETE'))
+def tasg(tid):
+    '''
+    GET: cyflwr (a chanlyniad) tasg. DELETE: canslo (409 os yw'n rhedeg
+    yn barod neu wedi gorffen).
+    '''
+    if request.method == 'DELETE':
+        if not tasgau.canslo(tid):
+            abort(404 if tasgau.get(tid) is None else 409)
+
+    tasg = tasgau.get(tid)
+    if tasg is None:
+        abort(404)
+    return jsonify(_tasg_json(tasg))
+
+
+@app.route('/tasgau/<tid>/ffrwd')
+def tasg_ffrwd(tid):
+    '''
+    Server-sent events: `data: {cyflwr}` pan fo'r dasg yn gorffen, gyda
+    sylw bob 15 eiliad i gadw'r cysylltiad yn fyw.
+    '''
+    if tasgau.get(tid) is None:
+        abort(404)
+
+    def ffrwd():
+        while not tasgau.aros(tid, timeout=15):
+            yield ': aros\n\n'
+        tasg = tasgau.get(tid)
+        if tasg:
+            yield 'data: {}\n\n'.format(json.dumps(_tasg_json(tasg), ensure_ascii=False, default=str))
+
+    return Response(stream_with_context(ffrwd()), mimetype='text/event-stream')
+
+
 @app.route('/pysgota', methods=('GET', 'POST'))
 def pysgota():
     if request.method == 'POST':
         s = request.form['mewnbwn']
         if not s:
             return render_template('pysgota.html', context=None)
-        
-        pe = Peiriant()
 
-        dalfa = pe.pysgotwr(s, min_sillafau=4, max_sillafau=8)
-
-        # console
-        # print('dalfa:', dalfa)
+        # ffenest
+        min_sillafau = _int(request.form.get('min_sillafau'), 4, 1, 20)
+        max_sillafau = _int(request.form.get('max_sillafau'), 8, min_sillafau, 20)
 
         # context
         context = {}
         context['smap'] = smap
         context['cmap'] = cmap
         context['llythrenwau'] = llythrenwau['cynghanedd'] | llythrenwau['aceniad']
-
-        context['dalfa'] = dalfa
+        context['min_sillafau'] = min_sillafau
+        context['max_sillafau'] = max_sillafau
 
         # init maps
         context['acenion'] = {}
         context['odlau'] = {}
         context['cytseinedd'] = {}
 
-        # maps
-        for dat in dalfa:
-            context['acenion'] = context['acenion'] | dat.cyfuno_acenion()
-            context['odlau'] = context['odlau'] | dat.cyfuno_odlau()
-            context['cytseinedd'] = context['cytseinedd'] | dat.cyfuno_cytseinedd()
+        # maps (diweddaru yn eu lle, cyn i bob dalfa gael ei rendro)
+        def dalfa():
+            for dat in gweithwyr.pysgota(s, min_sillafau=min_sillafau, max_sillafau=max_sillafau):
+                context['acenion'].update(dat.cyfuno_acenion())
+                context['odlau'].update(dat.cyfuno_odlau())
+                context['cytseinedd'].update(dat.cyfuno_cytseinedd())
+                yield dat
+
+        context['dalfa'] = dalfa()
 
-        return render_template('pysgota.html', context=context)
+        # ffrydio'r dudalen wrth i'r ddalfa gyrraedd
+        return stream_template('pysgota.html', context=context)
 
     return render_template('pysgota.html', context=None)
 
@@ -342,35 +576,47 @@ def darlunio():
         if not s or type(s) is not str:
             return render_template('darlunio.html', context=None)
 
-        dtype = request.form['drawingType']
+        dtype = request.form.get('drawingType')
+        if dtype not in ('complex', 'porwr'):
+            dtype = 'hyperbolic'
 
-        pe = Peiriant()
-        meta, uned = pe.parse(s)
+        context = {}
+        context['dtype'] = dtype
 
-        # console output
-        print('meta:', meta)
-        print('uned:', uned)
+        # storfa: yr un testun -> yr un darlun
+        if dtype == 'porwr':
+            # dim matplotlib: y porwr sy'n darlunio (static/js/olwyn.js)
+            context['graff'] = oriel.graff(s)
+        elif DARLUN_MODD == 'cof':
+            fname, data = oriel.darlunio_cof(s, dtype)
+            context['img_file'] = oriel.data_uri(fname, data)
+        else:
+            fname = oriel.darlunio(s, dtype)
+            context['img_file'] = url_for('static', filename='tmp/{}'.format(fname))
 
-        # datrys
-        dat = pe.datryswr(uned)
-        dat.set_nbrs()
+        return render_template('darlunio.html', context=context)
 
-        if dtype == 'hyperbolic':
-            fname = plot(dat, hyperbolic=True, ndots=100)
-        else:
-            fname = plot(dat)
+    return render_template('darlunio.html', context={'dtype': 'hyperbolic'})
 
-        # import time
-        # time.sleep(1)
 
-        context = {}
-        context['dtype'] = dtype
-        # context['img_file'] = fname
-        context['img_file'] = url_for('static', filename='tmp/{}'.format(fname))
+@app.route('/darlunio/graff', methods=('GET', 'POST'))
+def darlunio_graff():
+    '''
+    Graff cryno'r olwyn fel JSON (gweler `cyfresu.graff`):
 
-        return render_template('darlunio.html', context=context)
+        {"nodau": [...], "toriadau": [...],
+         "ymylon": {"cytseinedd": [[i, j], ...], "odlau": [[i, j], ...]}}
 
-    return render_template('darlunio.html', context={'dtype': 'hyperbolic'})
+    Mewnbwn: `mewnbwn` (GET/ffurflen) neu {"mewnbwn": "..."} (JSON).
+    '''
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        s = data.get('mewnbwn')
+    else:
+        s = request.values.get('mewnbwn')
+    if not isinstance(s, str) or not s.strip():
+        return jsonify({'gwall': 'disgwyl mewnbwn'}), 400
+    return jsonify(oriel.graff(s))
 
 
 @app.route('/dysgu')
@@ -411,9 +657,9 @@ def upload_file():
 
             context = {'filename': filename}
 
-            pe = Peiriant()
-            s = pe.read(fullpath)
-            meta, body = pe.parse(s)
+            with peiriant() as pe:
+                s = pe.read(fullpath)
+                meta, body = pe.parse(s)
             context['meta'] = meta
             context['testun'] = body
             context['amrwd'] = s
@@ -436,26 +682,177 @@ def cc():
 @app.route('/cerddi', methods=('GET', 'POST'))
 def cerddi():
     context = {}
-    context['db'] = create_cerddi_dict()
+    context['db'] = cerddi_dict()
     return render_template('cerddi.html', context=context)
 
 
+@app.route('/cerddi/<slug>')
+def cerdd(slug):
+    '''
+    Datrysiad cerdd o'r corpws (`datrys.html`) o'r datrysiad cryno a
+    grewyd gan `create_mefus()`, heb ddatrys dim.
+    '''
+    rec = adeiladwr.manifest().get(slug)
+    if not rec or not rec.get('cryno'):
+        abort(404)
+
+    def creu():
+        dat = load_cryno(rec)
+        return _context(dat.meta, None, dat)
+
+    # allwedd: slug + etag, felly mae cerdd sydd wedi newid yn cael ei hail-lwytho
+    return _datrys_html(storfa_cerddi, (slug, rec.get('etag')), creu)
+
+
+def _amodau_corpws():
+    # {maes: gwerth} o'r query string (dim ond meysydd `corpws.MEYSYDD`)
+    return {maes: request.args[maes] for maes in corpws.MEYSYDD if request.args.get(maes)}
+
+
+@app.route('/corpws')
+def chwilio_corpws():
+    '''
+    Chwilio llinellau'r corpws (mynegai `corpws.py`), e.e.
+
+        /corpws?dosbarth=CRO&cytseinedd=TRB
+    '''
+    amodau = _amodau_corpws()
+    context = {}
+    context['gwerthoedd'] = corpws.gwerthoedd()
+    context['llythrenwau'] = llythrenwau['aceniad']
+    if amodau:
+        try:
+            rhif = int(request.args.get('tudalen', 1))
+        except ValueError:
+            rhif = 1
+        context['canlyniad'] = corpws.chwilio(amodau, rhif=rhif)
+    return render_template('corpws.html', context=context)
+
+
+@app.route('/api/corpws')
+def api_corpws():
+    '''
+    Chwilio llinellau'r corpws fel JSON:
+
+        /api/corpws?dosbarth=CRO&cytseinedd=TRB&awdur=dafydd-ap-gwilym&tudalen=2
+    '''
+    try:
+        rhif = int(request.args.get('tudalen', 1))
+        maint = int(request.args.get('maint', CORPWS_TERFYN))
+    except ValueError:
+        return jsonify({'gwall': 'tudalen/maint annilys'}), 400
+
+    return jsonify(corpws.chwilio(_amodau_corpws(), rhif=rhif, maint=maint))
+
+
+@app.route('/ystadegau')
+def ystadegau():
+    '''
+    Dosbarthiadau, acenion a chytseinedd pob awdur, o giplun `cyfrifon`
+    (mae'r adeiladwr mefus yn ei ddiweddaru).
+    '''
+    context = {}
+    context['awduron'] = cyfrifon.ciplun()
+    context['cmap'] = cmap
+    context['llythrenwau'] = llythrenwau['aceniad']
+    return render_template('ystadegau.html', context=context)
+
+
+@app.route('/api/ystadegau')
+def api_ystadegau():
+    return jsonify(cyfrifon.ciplun())
+
+
+# rhestr mefus: dim ond pan fo'r adeiladwr yn gorffen y mae'n newid
+_mefus_cache = {'manifest': None, 'rhestr': None}
+
+
 @app.route('/mefus')
 def mefus():
 
-    refresh_mefus()
+    # y set gyflawn ddiwethaf
+    manifest = adeiladwr.manifest()
+    if _mefus_cache['manifest'] is manifest:
+        return render_template('mefus.html', context=_mefus_cache['rhestr'])
 
     mefus_root = Path(MEFUS_FOLDER)
     mefus = {}
 
-    for file in mefus_root.iterdir():
+    if manifest:
+        for slug, rec in manifest.items():
+            mefus[slug + '.xml'] = url_for('mefus_xml', slug=slug, v=rec.get('etag'))
+    else:
+        for file in mefus_root.iterdir():
 
-        # skip dot files
-        if file.name.startswith('.'):
-            continue
+            # skip dot files
+            if file.name.startswith('.') or file.suffix != '.xml':
+                continue
 
-        mefus[file.name] = url_for('static', filename='mefus/{}'.format(file.name))
+            mefus[file.name] = url_for('static', filename='mefus/{}'.format(file.name))
 
     # sort and return
     mefus = {key: value for key, value in sorted(mefus.items())}
+    _mefus_cache.update({'manifest': manifest, 'rhestr': mefus})
     return render_template('mefus.html', context=mefus)
+
+
+@app.route('/static/mefus/<slug>.xml')
+def mefus_static(slug):
+    '''
+    Hen ddolenni `static/mefus/<slug>.xml` (cyn enwi allbynnau yn ôl eu
+    cynnwys): ailgyfeirio at `/mefus/<slug>.xml`.
+    '''
+    if slug in adeiladwr.manifest():
+        return redirect(url_for('mefus_xml', slug=slug), code=301)
+    return send_from_directory(MEFUS_FOLDER, slug + '.xml')
+
+
+@app.route('/mefus/<slug>.xml')
+def mefus_xml(slug):
+    '''
+    XML gydag ETag cryf a fersiynau gzip/brotli a grewyd gan `create_mefus()`.
+    Mae dolenni `/mefus` yn cynnwys `?v=<etag>`, felly maen nhw'n sefydlog.
+    '''
+    rec = adeiladwr.manifest().get(slug)
+    if not rec:
+        abort(404)
+
+    fname = os.path.join(MEFUS_FOLDER, rec['allbwn'])
+    if not os.path.exists(fname):  # wedi'i dacluso (manifest hen iawn)
+        abort(404)
+    etag = rec.get('etag')  # hen manifest?
+    amgodiad = request.accept_encodings.best_match(
+        [enc for enc, ext in AMGODIADAU.items() if os.path.exists(fname + ext)]
+    )
+
+    # `?v=<etag>`: ni fydd y cynnwys hwn byth yn newid (enw yn ôl cynnwys)
+    sefydlog = bool(etag) and request.args.get('v') == etag
+    max_age = 31536000 if sefydlog else None  # fel arall `no-cache` (send_file)
+
+    if amgodiad and etag:
+        res = send_file(fname + AMGODIADAU[amgodiad], mimetype='application/xml',
+                        etag=etag + '-' + amgodiad, conditional=True, max_age=max_age)
+        res.headers['Content-Encoding'] = amgodiad
+    else:
+        res = send_file(fname, mimetype='application/xml', etag=etag or True, conditional=True, max_age=max_age)
+
+    res.vary.add('Accept-Encoding')
+    if sefydlog:
+        res.cache_control.immutable = True
+    return res
+
+
+@app.route('/statws')
+def statws():
+    return jsonify({
+        'mefus': adeiladwr.statws(),
+        'datrys': storfa_datrys.ystadegau(),
+        'cerddi': storfa_cerddi.ystadegau(),
+        'peiriannau': peiriannau.ystadegau(),
+        'tasgau': tasgau.ystadegau(),
+        'darluniau': oriel.ystadegau(),
+        'odliadur': mynegai_odlau.ystadegau(),
+        'cleciadur': mynegai_clecs.ystadegau(),
+        'corpws': corpws.ystadegau(),
+        'colofnau': colofnau.ystadegau(),
+    })
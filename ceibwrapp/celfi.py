@@ -7,12 +7,46 @@ dyle hwn allbynnu ffeil .json (h.y. fformat safonol).
 '''
 
 import os
+import json
+import time
+import threading
+import gzip
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import yaml
 from pathlib import Path
 from slugify import slugify
+from importlib.metadata import version, PackageNotFoundError
 
-from .settings import CERDDI_FOLDER, MEFUS_FOLDER
-from ceibwr.peiriant import Peiriant
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from .settings import CERDDI_FOLDER, MEFUS_FOLDER, MEFUS_MANIFEST, MEFUS_PROSESAU, MEFUS_AMDDIFAID, MEFUS_CADW
+from .settings import MEFUS_MYNEGAI, MEFUS_CYFRIFON
+from .peiriannau import peiriant, cynhesu
+from .storfa import ysgrifennu
+from .cryno import cyfresu as cyfresu_cryno, pacio, dadbacio, dad_gyfresu
+from .corpws import adeiladu as adeiladu_mynegai
+from .colofnau import allforio as allforio_colofnau, CYFREDOL as COLOFNAU_CYFREDOL
+from .cyfrifon import diweddaru as diweddaru_cyfrifon
+
+
+try:
+    CEIBWR_FERSIWN = version('ceibwr')
+except PackageNotFoundError:
+    CEIBWR_FERSIWN = None
+
+# mefus cywasgedig (Content-Encoding: estyniad)
+AMGODIADAU = {
+    'br': '.br',
+    'gzip': '.gz',
+}
+
+# datrysiad cryno (gweler `cryno.py`) wrth ymyl pob xml
+CRYNO_ESTYNIAD = '.cryno'
 
 
 def create_cerddi_dict():
@@ -31,16 +65,12 @@ def create_cerddi_dict():
         if subdir.name.startswith('.'):
             continue
 
-        print('SUBDIR:', subdir.name)
-
         db[subdir.name] = {
             'slug': slugify(subdir.name),
             'cerddi': [],
          }
 
         for file in subdir.iterdir():
-            print('FILE:', file)
-
             # ignore dot files
             if file.name.startswith('.'):
                 continue
@@ -57,7 +87,6 @@ def create_cerddi_dict():
                 body = parts[1].strip()
 
                 cerdd = yaml.safe_load(head)  # dict
-                print(cerdd)
 
                 # enforce `teitl`
                 if 'teitl' not in cerdd:
@@ -81,57 +110,359 @@ def create_cerddi_dict():
     return db
 
 
-# mefus
-def create_mefus():
+# mynegai cerddi (yn y cof, un i bob proses)
+_mynegai = {'llofnod': None, 'db': {}, 'awduron': {}, 'cerddi': {}}
+_mynegai_lock = threading.Lock()
+
+
+def mynegai_cerddi():
     '''
-    Rhestr datrysiadau xml.
-    Pearls before swine.
+    `create_cerddi_dict()` wedi'i gadw yn y cof, gyda mynegeion slug.
+    Dim ond pan fo `llofnod_cerddi()` yn newid y mae'r ffeiliau'n cael
+    eu darllen eto.
     '''
+    global _mynegai
+
+    llofnod = llofnod_cerddi()
+    with _mynegai_lock:
+        if llofnod != _mynegai['llofnod']:
+            db = create_cerddi_dict()
+            awduron = {}
+            cerddi = {}
+            for enw, awdur in db.items():
+                awduron[awdur['slug']] = dict(awdur, enw=enw)
+                for cerdd in awdur['cerddi']:
+                    cerddi[cerdd['slug']] = cerdd
+            _mynegai = {
+                'llofnod': llofnod,
+                'db': db,
+                'awduron': awduron,
+                'cerddi': cerddi,
+            }
+        return _mynegai
+
+
+def cerddi_dict():
+    return mynegai_cerddi()['db']
+
+
+def get_awdur(slug):
+    '''
+    {enw, slug, cerddi} neu `None`
+    '''
+    return mynegai_cerddi()['awduron'].get(slug)
+
 
-    pe = Peiriant()
-    mefus = {}
+def get_cerdd(slug):
+    '''
+    {teitl, awdur, ..., slug, testun, amrwd} neu `None`
+    '''
+    return mynegai_cerddi()['cerddi'].get(slug)
 
-    cerddi_root = Path(CERDDI_FOLDER)
-    for subdir in cerddi_root.iterdir():
 
-        # skip dot folders
-        if subdir.name.startswith('.'):
+# mefus
+def ffeiliau_cerddi():
+    '''
+    Rhestr (awdur, ffeil) o'r ffeiliau yn CERDDI_FOLDER,
+    heb ffeiliau/ffolderi cudd, mewn trefn sefydlog.
+    '''
+    ffeiliau = []
+    for subdir in sorted(Path(CERDDI_FOLDER).iterdir()):
+        if subdir.name.startswith('.') or not subdir.is_dir():
             continue
+        for file in sorted(subdir.iterdir()):
+            if file.name.startswith('.'):
+                continue
+            ffeiliau.append((subdir.name, file))
+    return ffeiliau
 
-        print(subdir)  # awdur
 
-        for file in subdir.iterdir():
+def llofnod_cerddi():
+    '''
+    Llofnod rhad o CERDDI_FOLDER (enw, mtime, maint pob ffeil) er mwyn
+    gweld a oes rhywbeth wedi newid heb agor y ffeiliau.
+    '''
+    llofnod = []
+    for awdur, file in ffeiliau_cerddi():
+        st = file.stat()
+        llofnod.append((awdur, file.name, st.st_mtime_ns, st.st_size))
+    return tuple(llofnod)
 
-            # skip dot files
-            if file.name.startswith('.'):
-                continue
 
-            print(file.name)
+def hash_ffeil(fname):
+    with open(fname, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def read_manifest():
+    '''
+    Manifest mefus: `dict` slug: {ffynhonnell, hash, ceibwr, allbwn, etag}
+    '''
+    try:
+        with open(MEFUS_MANIFEST) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
 
-            with open(file) as f:
-                s = f.read().strip()
+
+def write_manifest(manifest):
+    ysgrifennu(MEFUS_MANIFEST, json.dumps(manifest, indent=1, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+
+
+def datrys_cerdd(awdur, fname):
+    '''
+    Datrys un gerdd. Mae'n dychwelyd `dict` {slug, xml, cryno} neu `None`
+    os nad oes `teitl`. Mae gwallau'n cael eu dal a'u dychwelyd fel
+    {gwall} fel nad yw un gerdd wael yn lladd y swp cyfan; os mai dim ond
+    y cryno sy'n methu, mae `cryno` yn `None` a'r gwall yn `gwall_cryno`.
+    '''
+    try:
+        with open(fname) as f:
+            s = f.read().strip()
+
+        with peiriant() as pe:
 
             # parse
             meta, uned = pe.parse(s)
 
             # enforce teitl
             if 'teitl' not in meta:
-                continue
+                return None
 
             # datrys
             dat = pe.datryswr(uned)
             dat.set_nbrs()  # pwysig!
             dat.meta = meta
 
-            # record (dict)
-            slug = slugify(subdir.name + ' ' + meta['teitl'])
-            mefus[slug] = dat.xml_str(include_header=False)
+        canlyniad = {
+            'slug': slugify(awdur + ' ' + meta['teitl']),
+            'xml': dat.xml_str(),
+        }
+
+    except Exception as err:
+        return {'gwall': '{}: {}'.format(type(err).__name__, err)}
+
+    # ni ddylai methu â chreu'r datrysiad cryno golli'r xml
+    try:
+        canlyniad['cryno'] = pacio(cyfresu_cryno(dat, meta))
+    except Exception as err:
+        canlyniad['cryno'] = None
+        canlyniad['gwall_cryno'] = '{}: {}'.format(type(err).__name__, err)
+    return canlyniad
+
 
-            # write
-            fname = os.path.join(MEFUS_FOLDER, slug + '.xml')
+def create_mefus(llawn=False, prosesau=None, cynnydd=None):
+    '''
+    Rhestr datrysiadau xml (dim ond cerddi newydd neu rai sydd wedi newid).
+    Pearls before swine.
+    '''
+
+    if prosesau is None:
+        prosesau = MEFUS_PROSESAU
+
+    hen = read_manifest()
+    ffynonellau = {rec['ffynhonnell']: slug for slug, rec in hen.items()}
+    manifest = {}
+
+    # pa gerddi sydd angen eu datrys?
+    tasgau = []
+    for awdur, file in ffeiliau_cerddi():
+
+        ffynhonnell = os.path.relpath(file, CERDDI_FOLDER)
+        hash_ = hash_ffeil(file)
+
+        # heb newid
+        slug = ffynonellau.get(ffynhonnell)
+        if slug and not llawn:
+            rec = hen[slug]
+            if (rec['hash'] == hash_
+                    and rec['ceibwr'] == CEIBWR_FERSIWN
+                    and 'etag' in rec
+                    and os.path.exists(os.path.join(MEFUS_FOLDER, rec['allbwn']))
+                    and rec.get('cryno')
+                    and os.path.exists(os.path.join(MEFUS_FOLDER, rec['cryno']))):
+                manifest[slug] = rec
+                continue
+
+        tasgau.append((awdur, str(file), ffynhonnell, hash_))
+
+    # datrys
+    awduron = [t[0] for t in tasgau]
+    fnames = [t[1] for t in tasgau]
+    if prosesau > 1 and len(tasgau) > 1:
+        pool = ProcessPoolExecutor(
+            max_workers=min(prosesau, len(tasgau)),
+            mp_context=multiprocessing.get_context('spawn'),  # edafedd eraill (adeiladwr)
+            initializer=cynhesu,
+        )
+        with pool:
+            canlyniadau = pool.map(datrys_cerdd, awduron, fnames)
+            gwallau = _cofnodi(tasgau, canlyniadau, manifest, cynnydd, hen)
+    else:
+        canlyniadau = map(datrys_cerdd, awduron, fnames)
+        gwallau = _cofnodi(tasgau, canlyniadau, manifest, cynnydd, hen)
+
+    if manifest != hen:
+        write_manifest(manifest)
+
+    # mynegai chwilio'r corpws (gweler `corpws.py`), y colofnau (`colofnau.py`)
+    # a chyfrifon yr awduron (`cyfrifon.py`), os yw'r manifest wedi newid
+    deilliadau = (MEFUS_MYNEGAI, COLOFNAU_CYFREDOL, MEFUS_CYFRIFON)
+    if llawn or manifest != hen or not all(os.path.exists(fname) for fname in deilliadau):
+        mynegai = adeiladu_mynegai(manifest)
+        allforio_colofnau(mynegai['cerddi'])
+        diweddaru_cyfrifon(mynegai['cerddi'])
+
+    # hen allbynnau: eu dileu yn nes ymlaen (`tacluso`), ar ôl i bawb
+    # gyfnewid i'r manifest newydd
+    amddifo(hen, manifest)
+
+    for ffynhonnell, gwall in gwallau:
+        print('GWALL:', ffynhonnell, gwall)
+
+    return manifest
+
+
+def _enw(slug, data, estyniad):
+    # enw ffeil yn ôl ei chynnwys
+    return '{}.{}{}'.format(slug, hashlib.sha256(data).hexdigest()[:16], estyniad)
+
+
+def _ffeiliau(rec):
+    # ffeiliau un cofnod yn y manifest
+    ffeiliau = [rec['allbwn']] + [rec['allbwn'] + ext for ext in AMGODIADAU.values()]
+    if rec.get('cryno'):
+        ffeiliau.append(rec['cryno'])
+    return ffeiliau
+
+
+def _darllen_amddifaid():
+    try:
+        with open(MEFUS_AMDDIFAID) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _ysgrifennu_amddifaid(amddifaid):
+    ysgrifennu(MEFUS_AMDDIFAID, json.dumps(amddifaid, indent=1, sort_keys=True).encode('utf-8'))
+
+
+def amddifo(hen, manifest):
+    '''
+    Nodi allbynnau `hen` nad ydyn nhw yn `manifest` yn MEFUS_AMDDIFAID
+    ({ffeil: amser}), i'w dileu gan `tacluso()`.
+    '''
+    defnydd = {fname for rec in manifest.values() for fname in _ffeiliau(rec)}
+    amddifaid = _darllen_amddifaid()
+    newydd = dict(amddifaid)
+    for rec in hen.values():
+        for fname in _ffeiliau(rec):
+            if fname not in defnydd and fname not in newydd:
+                newydd[fname] = time.time()
+    if newydd != amddifaid:
+        _ysgrifennu_amddifaid(newydd)
+
+
+def tacluso(manifest, cadw=MEFUS_CADW):
+    '''
+    Dileu allbynnau amddifad (gweler `amddifo`) sy'n hŷn na `cadw` eiliad.
+    Mae'r prosesau eraill yn dal i weini'r hen manifest nes iddyn nhw sylwi
+    ar yr un newydd, felly dylid galw hwn ar ôl cyfnewid, gyda `cadw` yn
+    fwy na MEFUS_CYFNOD. Dychwelyd nifer y ffeiliau a ddilewyd.
+    '''
+    defnydd = {fname for rec in manifest.values() for fname in _ffeiliau(rec)}
+    amddifaid = _darllen_amddifaid()
+    newydd = {}
+    dilewyd = 0
+    for fname, amser in amddifaid.items():
+        if fname in defnydd:
+            continue
+        if time.time() - amser < cadw:
+            newydd[fname] = amser
+            continue
+        path = os.path.join(MEFUS_FOLDER, fname)
+        if os.path.exists(path):
+            print('DILEU:', path)
+            os.remove(path)
+            dilewyd += 1
+    if newydd != amddifaid:
+        _ysgrifennu_amddifaid(newydd)
+    return dilewyd
+
+
+def _cofnodi(tasgau, canlyniadau, manifest, cynnydd=None, hen=None):
+    '''
+    Ysgrifennu canlyniadau (yn nhrefn `tasgau`) a diweddaru `manifest`.
+    Os oes gwall, mae cofnod y gerdd yn `hen` (a'i ffeiliau) yn aros.
+    Dychwelyd rhestr (ffynhonnell, gwall).
+    '''
+    hen = hen or {}
+    ffynonellau = {rec['ffynhonnell']: slug for slug, rec in hen.items()}
+    gwallau = []
+    for wedi, (tasg, canlyniad) in enumerate(zip(tasgau, canlyniadau), start=1):
+        awdur, file, ffynhonnell, hash_ = tasg
+
+        print(ffynhonnell)
+
+        gwall = canlyniad.get('gwall') if canlyniad else None
+        if cynnydd:
+            cynnydd(wedi, len(tasgau), ffynhonnell, gwall)
+
+        if canlyniad is None:
+            continue
+
+        if gwall:
+            gwallau.append((ffynhonnell, gwall))
+
+            # cadw'r fersiwn dda ddiwethaf (a'i hash, fel ei bod yn cael ei datrys eto)
+            slug = ffynonellau.get(ffynhonnell)
+            if slug and slug not in manifest:
+                manifest[slug] = hen[slug]
+            continue
+
+        # write (enw newydd os yw'r cynnwys yn newydd)
+        slug = canlyniad['slug']
+        data = canlyniad['xml'].encode('utf-8')
+        etag = hashlib.sha256(data).hexdigest()[:32]
+        allbwn = _enw(slug, data, '.xml')
+        fname = os.path.join(MEFUS_FOLDER, allbwn)
+        if not os.path.exists(fname):
             print('FNAME:', fname)
-            with open(fname, 'w+') as f:
-                f.write(dat.xml_str())
+
+            # fersiynau cywasgedig (cyn yr xml, sy'n dangos bod y set yn gyflawn)
+            ysgrifennu(fname + AMGODIADAU['gzip'], gzip.compress(data, mtime=0))
+            if brotli:
+                ysgrifennu(fname + AMGODIADAU['br'], brotli.compress(data))
+            ysgrifennu(fname, data)
+
+        # datrysiad cryno (i'w lwytho heb ddatrys eto)
+        cryno = None
+        if canlyniad['cryno'] is not None:
+            cryno = _enw(slug, canlyniad['cryno'], CRYNO_ESTYNIAD)
+            if not os.path.exists(os.path.join(MEFUS_FOLDER, cryno)):
+                ysgrifennu(os.path.join(MEFUS_FOLDER, cryno), canlyniad['cryno'])
+        else:
+            gwallau.append((ffynhonnell, 'cryno: ' + canlyniad['gwall_cryno']))
+
+        manifest[slug] = {
+            'ffynhonnell': ffynhonnell,
+            'hash': hash_,
+            'ceibwr': CEIBWR_FERSIWN,
+            'allbwn': allbwn,
+            'cryno': cryno,
+            'etag': etag,
+        }
+
+    return gwallau
+
+
+def load_cryno(rec):
+    '''
+    Datrysiad cerdd (`cryno.DatrysiadCryno`) o'i chofnod yn y manifest.
+    '''
+    with open(os.path.join(MEFUS_FOLDER, rec['cryno']), 'rb') as f:
+        return dad_gyfresu(dadbacio(f.read()))
 
 
 def main():
@@ -144,6 +475,7 @@ def main():
     mefus = create_mefus()
     pprint.pprint(mefus)
     print()
+    tacluso(mefus)
 
 
 if __name__ == "__main__":
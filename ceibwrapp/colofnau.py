@@ -0,0 +1,215 @@
+# colofnau.py
+'''
+Storfa golofnog o linellau'r corpws ar gyfer dadansoddi (NumPy, `.npy`).
+
+Mae `allforio()` yn cael ei alw gan `create_mefus()` (ar ôl `corpws.adeiladu`)
+ac yn ysgrifennu un arae i bob colofn, un rhes i bob llinell:
+
+    awdur, slug, dosbarth, aceniad   int32  (mynegai yn `llinynnau`, -1 = dim)
+    rhif, nifer_sillafau             int16  (-1 = dim)
+    GEF, CYS, ..., PEG               int16  (nifer cysylltiadau cytseinedd)
+    OFE, OGY, ODL                    int16  (nifer odlau)
+
+a `meta.json` gyda'r tabl llinynnau. Mae pob fersiwn mewn ffolder ei hun
+o dan COLOFNAU_FOLDER, ac mae `cyfredol.json` yn cael ei symud i'w le ar
+y diwedd, felly does neb yn gweld set hanner ffordd. Mae'r set flaenorol
+yn aros tan yr allforio nesaf, i brosesau sydd newydd ddarllen yr hen
+`cyfredol.json` (ac mae hen `memmap` yn dal i weithio ar ôl i'r ffeiliau
+gael eu dileu).
+
+Mae `llwytho()` yn agor y colofnau gyda `mmap_mode='r'`, un waith i bob
+proses, e.e.
+
+    col = llwytho()
+    np.bincount(col['colofnau']['dosbarth'] + 1)  # -1 -> 0
+'''
+
+import os
+import json
+import shutil
+import hashlib
+
+import numpy as np
+
+from .storfa import Ciplun, ysgrifennu
+from .settings import COLOFNAU_FOLDER
+
+
+FERSIWN = 1
+
+# mathau cysylltiadau (gweler `app.cmap`)
+CYTSEINEDD = ('GEF', 'CYS', 'TRA', 'TRB', 'CYB', 'GWG', 'PEG')
+ODLAU = ('OFE', 'OGY', 'ODL')
+
+LLINYNNAU = ('awdur', 'slug', 'dosbarth', 'aceniad')
+RHIFAU = ('rhif', 'nifer_sillafau')
+
+CYFREDOL = os.path.join(COLOFNAU_FOLDER, 'cyfredol.json')
+
+
+def _rhesi(cerddi):
+    # (slug, cerdd, rhes) yn yr un drefn a `corpws.mynegai()`
+    for slug in sorted(cerddi):
+        cerdd = cerddi[slug]
+        for rhes in cerdd['llinellau']:
+            yield slug, cerdd, rhes
+
+
+def colofnau(cerddi):
+    '''
+    ({enw: np.ndarray}, llinynnau) o gofnodion `corpws` ({slug: cerdd}).
+    '''
+    llinynnau = []
+    safle = {}
+
+    def cod(s):
+        if s is None:
+            return -1
+        if s not in safle:
+            safle[s] = len(llinynnau)
+            llinynnau.append(s)
+        return safle[s]
+
+    rhesi = list(_rhesi(cerddi))
+    col = {
+        'awdur': np.array([cod(cerdd['awdur']) for _, cerdd, _ in rhesi], dtype=np.int32),
+        'slug': np.array([cod(slug) for slug, _, _ in rhesi], dtype=np.int32),
+        'dosbarth': np.array([cod(rhes['dosbarth']) for _, _, rhes in rhesi], dtype=np.int32),
+        'aceniad': np.array([cod(rhes['aceniad']) for _, _, rhes in rhesi], dtype=np.int32),
+    }
+    for enw in RHIFAU:
+        col[enw] = np.array([-1 if rhes[enw] is None else rhes[enw] for _, _, rhes in rhesi], dtype=np.int16)
+    for maes, mathau in (('cytseinedd', CYTSEINEDD), ('odlau', ODLAU)):
+        for math in mathau:
+            col[math] = np.array([rhes[maes].get(math, 0) for _, _, rhes in rhesi], dtype=np.int16)
+    return col, llinynnau
+
+
+def allforio(cerddi):
+    '''
+    Ysgrifennu set newydd o golofnau ar gyfer `cerddi` (os yw wedi newid).
+    Dychwelyd enw'r ffolder.
+    '''
+    col, llinynnau = colofnau(cerddi)
+
+    # enw'r ffolder: hash y cynnwys
+    h = hashlib.sha256(str(FERSIWN).encode())
+    h.update(json.dumps(llinynnau, ensure_ascii=False).encode('utf-8'))
+    for enw in sorted(col):
+        h.update(enw.encode())
+        h.update(col[enw].tobytes())
+    enw_ffolder = h.hexdigest()[:16]
+
+    cyfredol = _cyfredol()
+    if cyfredol and cyfredol.get('ffolder') == enw_ffolder:
+        return enw_ffolder
+
+    # (mae'r enw'n hash, felly mae set sy'n bodoli yn barod yr un peth)
+    ffolder = os.path.join(COLOFNAU_FOLDER, enw_ffolder)
+    if not os.path.isdir(ffolder):
+        tmp = ffolder + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for enw, arae in col.items():
+            np.save(os.path.join(tmp, enw + '.npy'), arae)
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump({
+                'fersiwn': FERSIWN,
+                'nifer': len(col['slug']),
+                'colofnau': {enw: str(arae.dtype) for enw, arae in col.items()},
+                'llinynnau': llinynnau,
+            }, f, ensure_ascii=False)
+        os.replace(tmp, ffolder)
+
+    # newid y set gyfredol
+    ysgrifennu(CYFREDOL, json.dumps({'ffolder': enw_ffolder}).encode('utf-8'))
+
+    # dileu hen setiau, heblaw'r un flaenorol (am un genhedlaeth arall)
+    cadw = {enw_ffolder, cyfredol.get('ffolder') if cyfredol else None}
+    for entry in os.scandir(COLOFNAU_FOLDER):
+        if entry.is_dir() and entry.name not in cadw:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+    return enw_ffolder
+
+
+def _cyfredol():
+    try:
+        with open(CYFREDOL) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _llwytho():
+    cyfredol = _cyfredol()
+    if not cyfredol:
+        return None
+    ffolder = os.path.join(COLOFNAU_FOLDER, cyfredol['ffolder'])
+    with open(os.path.join(ffolder, 'meta.json')) as f:
+        meta = json.load(f)
+    if meta.get('fersiwn') != FERSIWN:
+        return None
+    return {
+        'nifer': meta['nifer'],
+        'llinynnau': meta['llinynnau'],
+        'colofnau': {
+            # (does dim modd mmap arae wag)
+            enw: np.load(os.path.join(ffolder, enw + '.npy'), mmap_mode='r' if meta['nifer'] else None)
+            for enw in meta['colofnau']
+        },
+    }
+
+
+_ciplun = Ciplun(_llwytho)
+
+
+def llwytho():
+    '''
+    {'nifer', 'llinynnau', 'colofnau': {enw: memmap}} (darllen yn unig), neu
+    `None` os nad oes colofnau. Mae'n cael ei ail-agor pan fo'r set yn newid.
+    '''
+    # gall set gael ei dileu rhwng darllen `cyfredol.json` a'i hagor (os oes
+    # dau allforio yn gyflym): darllen `cyfredol.json` eto
+    for _ in range(3):
+        try:
+            return _ciplun.get(CYFREDOL)
+        except FileNotFoundError:
+            continue
+    return None
+
+
+def dadgodio(col, enw):
+    '''
+    Colofn llinynnau (`awdur`, `slug`, `dosbarth`, `aceniad`) fel rhestr.
+    '''
+    llinynnau = col['llinynnau']
+    return [llinynnau[i] if i >= 0 else None for i in col['colofnau'][enw]]
+
+
+def ystadegau():
+    col = llwytho()
+    if col is None:
+        return None
+    return {
+        'llinellau': col['nifer'],
+        'colofnau': len(col['colofnau']),
+        'llinynnau': len(col['llinynnau']),
+    }
+
+
+def main():
+    # crynodeb: llinellau i bob dosbarth
+    col = llwytho()
+    if col is None:
+        print('dim colofnau yn', COLOFNAU_FOLDER)
+        return
+    dosbarth = col['colofnau']['dosbarth']
+    cyfrif = np.bincount(dosbarth + 1, minlength=len(col['llinynnau']) + 1)
+    print('llinellau:', col['nifer'])
+    for idx in np.nonzero(cyfrif)[0]:
+        print('{:>8} {}'.format(cyfrif[idx], col['llinynnau'][idx - 1] if idx else '-'))
+
+
+if __name__ == '__main__':
+    main()
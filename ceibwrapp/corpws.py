@@ -0,0 +1,237 @@
+# corpws.py
+'''
+Mynegai gwrthdro dros linellau'r corpws (y datrysiadau cryno yn
+MEFUS_FOLDER), ar gyfer chwilio heb ddatrys dim.
+
+Mae `adeiladu()` yn cael ei alw gan `create_mefus()` ac yn ysgrifennu
+MEFUS_MYNEGAI:
+
+    {
+        'fersiwn': 1,
+        'cerddi': {slug: {'etag': ..., 'awdur': ..., 'teitl': ...,
+                          'llinellau': [{'rhif', 'testun', 'dosbarth', 'aceniad',
+                                         'nifer_sillafau', 'cytseinedd', 'odlau',
+                                         'odl'}, ...]}},
+        'mynegai': {'dosbarth': {gwerth: [id, ...]}, 'cytseinedd': {...},
+                    'odlau': {...}, 'odl': {...}, 'awdur': {...}},
+    }
+
+lle mae `id` yn rhif llinell yn y corpws cyfan (cerddi yn nhrefn slug,
+llinellau yn eu trefn). Dim ond cerddi sydd â `etag` newydd sy'n cael eu
+darllen eto. Mae `chwilio()` yn croestorri setiau'r mynegai.
+'''
+
+import os
+import json
+from collections import Counter
+
+from slugify import slugify
+
+from .cryno import dadbacio
+from .storfa import Ciplun, tudalennu, ysgrifennu
+from .settings import MEFUS_FOLDER, MEFUS_MYNEGAI, CORPWS_TERFYN, CORPWS_TUDALEN_UCHAFSWM
+
+
+FERSIWN = 1
+
+# meysydd y gellir chwilio arnyn nhw
+MEYSYDD = ('dosbarth', 'cytseinedd', 'odlau', 'odl', 'awdur')
+
+
+
+def llinellau(data):
+    '''
+    Rhesi llinellau (`dict`) o ddatrysiad cryno (`cryno.cyfresu`).
+    '''
+    d_nodau = data['nodau']
+    d_elfennau = data['elfennau']
+    mathau = [dosbarthiadau for _, dosbarthiadau in data['mathau']]
+    cytseinedd = dict(data['cytseinedd'])
+    odlau = dict(data['odlau'])
+    rhiant = d_elfennau['rhiant']
+
+    def testun(idx):
+        return ''.join(d_nodau['testun'][d_elfennau['dechrau'][idx]:d_elfennau['diwedd'][idx]])
+
+    rhesi = []
+    for key, rhaniad in sorted(data['rhaniadau'].items(), key=lambda x: int(x[0])):
+        if rhaniad.get('lefel') != 1:
+            continue
+        idx = int(key)
+        dechrau, diwedd = d_elfennau['dechrau'][idx], d_elfennau['diwedd'][idx]
+
+        # disgynyddion (preorder: nes bod y rhiant cyn `idx`)
+        disgynyddion = []
+        jdx = idx + 1
+        while jdx < len(rhiant) and rhiant[jdx] >= idx:
+            disgynyddion.append(jdx)
+            jdx += 1
+
+        # yr odl olaf yw allwedd odl y llinell
+        odlau_llinell = [jdx for jdx in disgynyddion if 'Odl' in mathau[d_elfennau['math'][jdx]]]
+        odl = testun(odlau_llinell[-1]).strip().lower() if odlau_llinell else None
+
+        rhesi.append({
+            'rhif': len(rhesi) + 1,
+            'testun': ' '.join(testun(idx).split()),
+            'dosbarth': d_elfennau['dosbarth'][idx],
+            'aceniad': rhaniad.get('aceniad'),
+            'nifer_sillafau': rhaniad.get('nifer_sillafau'),
+            'cytseinedd': dict(Counter(cytseinedd[i] for i in range(dechrau, diwedd) if i in cytseinedd)),
+            'odlau': dict(Counter(odlau[jdx] for jdx in disgynyddion if jdx in odlau)),
+            'odl': odl or None,
+        })
+    return rhesi
+
+
+def _cerdd(rec, hen=None):
+    # cofnod un gerdd (o `hen` os nad yw'r etag wedi newid)
+    if hen and hen.get('etag') == rec.get('etag'):
+        return hen
+    with open(os.path.join(MEFUS_FOLDER, rec['cryno']), 'rb') as f:
+        data = dadbacio(f.read())
+    meta = data.get('meta', {})
+    return {
+        'etag': rec.get('etag'),
+        'awdur': os.path.dirname(rec['ffynhonnell']) or meta.get('awdur'),
+        'teitl': meta.get('teitl'),
+        'llinellau': llinellau(data),
+    }
+
+
+def _gwrthdroi(cerddi):
+    # {maes: {gwerth: [id, ...]}}
+    mynegai = {maes: {} for maes in MEYSYDD}
+    idx = 0
+    for slug in sorted(cerddi):
+        cerdd = cerddi[slug]
+        awdur = slugify(cerdd['awdur'] or '')
+        for rhes in cerdd['llinellau']:
+            gwerthoedd = {
+                'dosbarth': [rhes['dosbarth']],
+                'cytseinedd': list(rhes['cytseinedd']),
+                'odlau': list(rhes['odlau']),
+                'odl': [rhes['odl']],
+                'awdur': [awdur],
+            }
+            for maes, rhestr in gwerthoedd.items():
+                for gwerth in rhestr:
+                    if gwerth:
+                        mynegai[maes].setdefault(gwerth, []).append(idx)
+            idx += 1
+    return mynegai
+
+
+def darllen():
+    '''
+    MEFUS_MYNEGAI fel `dict` (neu `None`).
+    '''
+    try:
+        with open(MEFUS_MYNEGAI) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get('fersiwn') != FERSIWN:
+        return None
+    return data
+
+
+def adeiladu(manifest):
+    '''
+    Ysgrifennu MEFUS_MYNEGAI ar gyfer `manifest` (gweler `create_mefus`).
+    Dim ond cerddi newydd neu rai sydd wedi newid sy'n cael eu darllen.
+    '''
+    hen = (darllen() or {}).get('cerddi', {})
+    cerddi = {}
+    for slug, rec in manifest.items():
+        if not rec.get('cryno'):
+            continue
+        try:
+            cerddi[slug] = _cerdd(rec, hen.get(slug))
+        except (OSError, ValueError, KeyError) as err:
+            print('MYNEGAI:', slug, type(err).__name__, err)
+
+    data = {
+        'fersiwn': FERSIWN,
+        'cerddi': cerddi,
+        'mynegai': _gwrthdroi(cerddi),
+    }
+    if cerddi == hen and os.path.exists(MEFUS_MYNEGAI):
+        return data
+
+    ysgrifennu(MEFUS_MYNEGAI, json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    return data
+
+
+def _llwytho():
+    # y mynegai yn y cof: rhestr fflat o linellau a setiau
+    data = darllen() or {'cerddi': {}, 'mynegai': {maes: {} for maes in MEYSYDD}}
+    rhesi = []
+    for slug in sorted(data['cerddi']):
+        cerdd = data['cerddi'][slug]
+        for rhes in cerdd['llinellau']:
+            rhesi.append(dict(rhes, slug=slug, awdur=cerdd['awdur'], teitl=cerdd['teitl']))
+    return {
+        'rhesi': rhesi,
+        'setiau': {
+            maes: {gwerth: frozenset(ids) for gwerth, ids in gwerthoedd.items()}
+            for maes, gwerthoedd in data['mynegai'].items()
+        },
+        'cerddi': len(data['cerddi']),
+    }
+
+
+_ciplun = Ciplun(_llwytho)
+
+
+def mynegai():
+    '''
+    Y mynegai yn y cof (setiau a rhestr fflat o linellau), wedi'i
+    ail-ddarllen pan fo MEFUS_MYNEGAI yn newid.
+    '''
+    return _ciplun.get(MEFUS_MYNEGAI)
+
+
+def chwilio(amodau, rhif=1, maint=CORPWS_TERFYN):
+    '''
+    Llinellau sy'n cwrdd â phob un o `amodau` ({maes: gwerth}, e.e.
+    {'dosbarth': 'CRO', 'cytseinedd': 'TRB'}), fesul tudalen (rhif o 1).
+    '''
+    myn = mynegai()
+
+    ids = None
+    for maes, gwerth in amodau.items():
+        if maes not in MEYSYDD:
+            raise KeyError(maes)
+        if maes == 'awdur':
+            gwerth = slugify(gwerth)
+        elif maes == 'odl':
+            gwerth = gwerth.strip().lower()
+        set_ = myn['setiau'].get(maes, {}).get(gwerth, frozenset())
+        ids = set_ if ids is None else ids & set_
+
+    ids = sorted(ids) if ids is not None else range(len(myn['rhesi']))
+    canlyniad = tudalennu(ids, rhif, maint, CORPWS_TUDALEN_UCHAFSWM, 'llinellau')
+    canlyniad['llinellau'] = [myn['rhesi'][idx] for idx in canlyniad['llinellau']]
+    canlyniad['amodau'] = amodau
+    return canlyniad
+
+
+def gwerthoedd():
+    '''
+    {maes: [(gwerth, nifer llinellau), ...]} ar gyfer y ffurflen chwilio.
+    '''
+    myn = mynegai()
+    return {
+        maes: sorted(((gwerth, len(ids)) for gwerth, ids in setiau.items()), key=lambda x: (-x[1], x[0]))
+        for maes, setiau in myn['setiau'].items()
+    }
+
+
+def ystadegau():
+    myn = mynegai()
+    return {
+        'cerddi': myn['cerddi'],
+        'llinellau': len(myn['rhesi']),
+        'allweddi': {maes: len(setiau) for maes, setiau in myn['setiau'].items()},
+    }
@@ -0,0 +1,397 @@
+# cryno.py
+'''
+Fformat cryno (a fersiwn) ar gyfer datrysiadau, yn lle `dat.xml_str()`.
+
+Mae'r goeden yn cael ei throi'n arae o nodau ac arae o elfennau (mewn
+trefn preorder), gyda rhestrau o ymylon (`neighbours`) a'r mapiau
+`cyfuno_*` fel mynegeion i'r araeau hynny:
+
+    {
+        'fersiwn': 1,
+        'meta': {...},
+        'mathau': [[enw, [dosbarthiadau ceibwr ...]], ...],
+        'nodau': {'math': [...], 'testun': [...], 'label': [...], 'species': [...],
+                  'rhiant': [...]},
+        'elfennau': {'math': [...], 'rhiant': [...], 'dechrau': [...], 'diwedd': [...],
+                     'dosbarth': [...], 'species': [...], 'genus': [...], 'family': [...],
+                     'prif_lafariad': [...]},
+        'rhaniadau': {idx: {'lefel': ..., 'aceniad': ..., ...}},
+        'geiriau': {idx: terfyniad, ...},
+        'ymylon': {'nodau': [[i, j], ...], 'odlau': [[i, j], ...]},
+        'acenion': [[nod, gwerth], ...],
+        'odlau': [[elfen, gwerth], ...],
+        'cytseinedd': [[nod, gwerth], ...],
+        'cyfrif': {'rhaniadau': ..., 'geiriau': ..., 'sillafau': ...},
+    }
+
+Mae `dad_gyfresu()` yn adfer coeden o wrthrychau `Elfen`/`NodCryno` sy'n
+ymddwyn fel gwrthrychau ceibwr i'r templedi (`datrys.html`) ac i
+`darlun` (gweler `yn()` am brofion math). Mae `pacio()`/`dadbacio()` yn
+rhoi'r un peth fel beit (JSON + zlib).
+'''
+
+import json
+import zlib
+
+from ceibwr.nod import Nod
+
+
+FERSIWN = 1
+PENNAWD = b'CRY1'
+
+
+def _galw(gwrthrych, enw, *args, **kwargs):
+    # dull dewisol (dim ond rhai lefelau sydd â `lefel()`, `aceniad_str()`, ...);
+    # mae gwallau o'r dull ei hun yn codi fel arfer
+    dull = getattr(gwrthrych, enw, None)
+    if dull is None:
+        return None
+    return dull(*args, **kwargs)
+
+
+def _mathau(gwrthrych):
+    if isinstance(gwrthrych, (Elfen, NodCryno)):
+        return gwrthrych.mathau
+    return [c.__name__ for c in type(gwrthrych).__mro__ if c.__module__.startswith('ceibwr')]
+
+
+def cyfresu(dat, meta=None):
+    '''
+    `dict` cryno (JSON) o `dat`.
+    '''
+    mathau = {}
+    nodau = []  # (nod, rhiant)
+    elfennau = []  # [elfen, rhiant, dechrau, diwedd]
+
+    def math(gwrthrych):
+        dosbarthiadau = _mathau(gwrthrych)
+        enw = dosbarthiadau[0] if dosbarthiadau else type(gwrthrych).__name__
+        if enw not in mathau:
+            mathau[enw] = (len(mathau), dosbarthiadau)
+        return mathau[enw][0]
+
+    def cerdded(elfen, rhiant):
+        idx = len(elfennau)
+        math(elfen)
+        elfennau.append([elfen, rhiant, len(nodau), None])
+        for plentyn in getattr(elfen, 'children', None) or []:
+            if isinstance(plentyn, (Nod, NodCryno)):
+                math(plentyn)
+                nodau.append((plentyn, idx))
+            else:
+                cerdded(plentyn, idx)
+        elfennau[idx][3] = len(nodau)
+
+    cerdded(dat, -1)
+
+    safle_nod = {id(nod): idx for idx, (nod, _) in enumerate(nodau)}
+    safle_elfen = {id(elfen[0]): idx for idx, elfen in enumerate(elfennau)}
+
+    # rhaniadau (llinellau ac uwch)
+    rhaniadau = {}
+    for idx, (elfen, _, _, _) in enumerate(elfennau):
+        lefel = _galw(elfen, 'lefel')
+        if lefel is None or lefel < 1:
+            continue
+        rhaniad = {
+            'lefel': lefel,
+            'odlau': _galw(elfen, 'odlau_str'),
+        }
+        if lefel == 1:
+            rhaniad.update({
+                'nifer_sillafau': _galw(elfen, 'nifer_sillafau'),
+                'aceniad': _galw(elfen, 'aceniad_str'),
+                'aceniad_pengoll': _galw(elfen, 'aceniad_str', pengoll=True),
+                'cytseinedd': _galw(elfen, 'cytseinedd_str'),
+            })
+        rhaniadau[str(idx)] = rhaniad
+
+    # terfyniadau geiriau (bylchau a diwedd llinellau yn y templedi)
+    geiriau = {}
+    for idx, (elfen, _, _, _) in enumerate(elfennau):
+        if 'Gair' in _mathau(elfen):
+            geiriau[str(idx)] = _galw(elfen, 'terfyniad')
+
+    # ymylon (i < j)
+    ymylon_nodau = []
+    for idx, (nod, _) in enumerate(nodau):
+        for nbr in getattr(nod, 'neighbours', None) or []:
+            idx_nbr = safle_nod.get(id(nbr))
+            if idx_nbr is not None and idx_nbr > idx:
+                ymylon_nodau.append([idx, idx_nbr])
+
+    ymylon_odlau = []
+    for idx, (elfen, _, _, _) in enumerate(elfennau):
+        if 'Odl' not in _mathau(elfen):
+            continue
+        for nbr in getattr(elfen, 'neighbours', None) or []:
+            idx_nbr = safle_elfen.get(id(nbr))
+            if idx_nbr is not None and idx_nbr > idx:
+                ymylon_odlau.append([idx, idx_nbr])
+
+    def prif_lafariad(elfen):
+        if 'Sillaf' not in _mathau(elfen):
+            return None
+        return safle_nod.get(id(_galw(elfen, 'prif_lafariad')))
+
+    def _map(cyfuno, safle):
+        return sorted([safle[id(key)], value] for key, value in (cyfuno or {}).items() if id(key) in safle)
+
+    return {
+        'fersiwn': FERSIWN,
+        'meta': meta or {},
+        'mathau': [[enw, dosbarthiadau] for enw, (_, dosbarthiadau) in sorted(mathau.items(), key=lambda x: x[1][0])],
+        'nodau': {
+            'math': [math(nod) for nod, _ in nodau],
+            'testun': [nod.text for nod, _ in nodau],
+            'label': [str(nod) for nod, _ in nodau],
+            'species': [getattr(nod, 'species', None) for nod, _ in nodau],
+            'rhiant': [rhiant for _, rhiant in nodau],
+        },
+        'elfennau': {
+            'math': [math(elfen) for elfen, _, _, _ in elfennau],
+            'rhiant': [rhiant for _, rhiant, _, _ in elfennau],
+            'dechrau': [dechrau for _, _, dechrau, _ in elfennau],
+            'diwedd': [diwedd for _, _, _, diwedd in elfennau],
+            'dosbarth': [getattr(elfen, 'dosbarth', None) for elfen, _, _, _ in elfennau],
+            'species': [getattr(elfen, 'species', None) for elfen, _, _, _ in elfennau],
+            'genus': [getattr(elfen, 'genus', None) for elfen, _, _, _ in elfennau],
+            'family': [getattr(elfen, 'family', None) for elfen, _, _, _ in elfennau],
+            'prif_lafariad': [prif_lafariad(elfen) for elfen, _, _, _ in elfennau],
+        },
+        'rhaniadau': rhaniadau,
+        'geiriau': geiriau,
+        'ymylon': {
+            'nodau': ymylon_nodau,
+            'odlau': ymylon_odlau,
+        },
+        'acenion': _map(_galw(dat, 'cyfuno_acenion'), safle_nod),
+        'odlau': _map(_galw(dat, 'cyfuno_odlau'), safle_elfen),
+        'cytseinedd': _map(_galw(dat, 'cyfuno_cytseinedd'), safle_nod),
+        'cyfrif': {
+            'rhaniadau': _galw(dat, 'nifer_rhaniadau'),
+            'geiriau': _galw(dat, 'nifer_geiriau'),
+            'sillafau': _galw(dat, 'nifer_sillafau'),
+        },
+    }
+
+
+def yn(gwrthrych, enw):
+    '''
+    Prawf math ar gyfer gwrthrychau cryno: `yn(nod, 'Cytsain')` (cf.
+    `isinstance(nod, Cytsain)`).
+    '''
+    return enw in getattr(gwrthrych, 'mathau', ())
+
+
+class NodCryno:
+
+    def __init__(self, text, label, mathau, species=None):
+        self.text = text
+        self.label = label
+        self.mathau = mathau
+        self.species = species
+        self.parent = None
+        self.neighbours = []
+
+    def __str__(self):
+        return self.label
+
+    def __repr__(self):
+        return '<{} {!r}>'.format(self.mathau[0] if self.mathau else 'Nod', self.text)
+
+
+class Elfen:
+    '''
+    Elfen o'r goeden (datrysiad, llinell, corfan, gair, sillaf, odl, ...).
+    '''
+
+    def __init__(self, mathau):
+        self.mathau = mathau
+        self.parent = None
+        self.children = []
+        self.neighbours = []
+        self.dosbarth = None
+        self.species = None
+        self.genus = None
+        self.family = None
+        self._prif_lafariad = None
+        self._rhaniad = {}
+        self._terfyniad = None
+
+    def __getitem__(self, idx):
+        return self.children[idx]
+
+    def __str__(self):
+        return ''.join(str(nod) for nod in self.nodau())
+
+    def __repr__(self):
+        return '<{} {!r}>'.format(self.mathau[0] if self.mathau else 'Elfen', str(self))
+
+    def _disgynyddion(self):
+        for plentyn in self.children:
+            if isinstance(plentyn, Elfen):
+                yield plentyn
+                yield from plentyn._disgynyddion()
+
+    def nodau(self):
+        nodau = []
+        for plentyn in self.children:
+            if isinstance(plentyn, NodCryno):
+                nodau.append(plentyn)
+            else:
+                nodau.extend(plentyn.nodau())
+        return nodau
+
+    def sillafau(self):
+        return [elfen for elfen in self._disgynyddion() if 'Sillaf' in elfen.mathau]
+
+    def sillaf_olaf(self):
+        sillafau = self.sillafau()
+        return sillafau[-1] if sillafau else None
+
+    def gair_olaf(self):
+        geiriau = [elfen for elfen in self._disgynyddion() if 'Gair' in elfen.mathau]
+        return geiriau[-1] if geiriau else None
+
+    def terfyniad(self):
+        return self._terfyniad or ''
+
+    def odl(self):
+        for elfen in self._disgynyddion():
+            if 'Odl' in elfen.mathau:
+                return elfen
+        return None
+
+    def prif_lafariad(self):
+        return self._prif_lafariad
+
+    def lefel(self):
+        return self._rhaniad.get('lefel', 0)
+
+    def nifer_sillafau(self):
+        if 'nifer_sillafau' in self._rhaniad:
+            return self._rhaniad['nifer_sillafau']
+        return len(self.sillafau())
+
+    def aceniad_str(self, pengoll=False):
+        return self._rhaniad.get('aceniad_pengoll' if pengoll else 'aceniad')
+
+    def cytseinedd_str(self):
+        return self._rhaniad.get('cytseinedd')
+
+    def odlau_str(self):
+        return self._rhaniad.get('odlau')
+
+
+class DatrysiadCryno(Elfen):
+    '''
+    Gwraidd y goeden: mapiau `cyfuno_*` a'r cyfrifon.
+    '''
+
+    def __init__(self, mathau):
+        super().__init__(mathau)
+        self.meta = {}
+        self._acenion = {}
+        self._odlau = {}
+        self._cytseinedd = {}
+        self._cyfrif = {}
+
+    def cyfuno_acenion(self):
+        return self._acenion
+
+    def cyfuno_odlau(self):
+        return self._odlau
+
+    def cyfuno_cytseinedd(self):
+        return self._cytseinedd
+
+    def set_nbrs(self):
+        # mae'r ymylon wedi'u hadfer yn barod
+        pass
+
+    def nifer_rhaniadau(self):
+        return self._cyfrif.get('rhaniadau')
+
+    def nifer_geiriau(self):
+        return self._cyfrif.get('geiriau')
+
+    def nifer_sillafau(self):
+        if self._cyfrif.get('sillafau') is not None:
+            return self._cyfrif['sillafau']
+        return super().nifer_sillafau()
+
+
+def dad_gyfresu(data):
+    '''
+    Adfer coeden (`DatrysiadCryno`) o `cyfresu(dat)`.
+    '''
+    if data.get('fersiwn') != FERSIWN:
+        raise ValueError('fersiwn cryno anhysbys: {}'.format(data.get('fersiwn')))
+
+    mathau = [dosbarthiadau for _, dosbarthiadau in data['mathau']]
+    d_nodau = data['nodau']
+    d_elfennau = data['elfennau']
+
+    nodau = [
+        NodCryno(text, label, mathau[math], species)
+        for math, text, label, species in zip(d_nodau['math'], d_nodau['testun'], d_nodau['label'], d_nodau['species'])
+    ]
+
+    elfennau = []
+    for idx, math in enumerate(d_elfennau['math']):
+        elfen = DatrysiadCryno(mathau[math]) if idx == 0 else Elfen(mathau[math])
+        elfen.dosbarth = d_elfennau['dosbarth'][idx]
+        elfen.species = d_elfennau['species'][idx]
+        elfen.genus = d_elfennau['genus'][idx]
+        elfen.family = d_elfennau['family'][idx]
+        elfen._rhaniad = data['rhaniadau'].get(str(idx), {})
+        elfen._terfyniad = data['geiriau'].get(str(idx))
+        prif = d_elfennau['prif_lafariad'][idx]
+        elfen._prif_lafariad = nodau[prif] if prif is not None else None
+        elfennau.append(elfen)
+
+    # plant: nodau ac elfennau yn nhrefn eu safle (elfen wag cyn nod yn yr
+    # un safle, fel yn `cyfresu`)
+    plant = [[] for _ in elfennau]
+    for idx, rhiant in enumerate(d_elfennau['rhiant']):
+        if rhiant >= 0:
+            elfennau[idx].parent = elfennau[rhiant]
+            plant[rhiant].append((d_elfennau['dechrau'][idx], 0, idx, elfennau[idx]))
+    for idx, rhiant in enumerate(d_nodau['rhiant']):
+        nodau[idx].parent = elfennau[rhiant]
+        plant[rhiant].append((idx, 1, idx, nodau[idx]))
+    for elfen, rhestr in zip(elfennau, plant):
+        elfen.children = [plentyn for *_, plentyn in sorted(rhestr, key=lambda x: x[:3])]
+
+    for idx, idx_nbr in data['ymylon']['nodau']:
+        nodau[idx].neighbours.append(nodau[idx_nbr])
+        nodau[idx_nbr].neighbours.append(nodau[idx])
+    for idx, idx_nbr in data['ymylon']['odlau']:
+        elfennau[idx].neighbours.append(elfennau[idx_nbr])
+        elfennau[idx_nbr].neighbours.append(elfennau[idx])
+
+    dat = elfennau[0]
+    dat.meta = data.get('meta', {})
+    dat._acenion = {nodau[idx]: gwerth for idx, gwerth in data['acenion']}
+    dat._odlau = {elfennau[idx]: gwerth for idx, gwerth in data['odlau']}
+    dat._cytseinedd = {nodau[idx]: gwerth for idx, gwerth in data['cytseinedd']}
+    dat._cyfrif = data.get('cyfrif', {})
+    return dat
+
+
+def pacio(data):
+    '''
+    `cyfresu()` -> beit (PENNAWD + JSON wedi'i gywasgu). Mae gwerthoedd
+    nad ydynt yn JSON (e.e. dyddiadau YAML yn `meta`) yn troi'n `str`.
+    '''
+    return PENNAWD + zlib.compress(json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8'), 9)
+
+
+def dadbacio(beit):
+    '''
+    Beit o `pacio()` -> `dict` (i `dad_gyfresu()`).
+    '''
+    if not beit.startswith(PENNAWD):
+        raise ValueError('nid fformat cryno')
+    return json.loads(zlib.decompress(beit[len(PENNAWD):]).decode('utf-8'))
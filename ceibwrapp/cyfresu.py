@@ -0,0 +1,104 @@
+# cyfresu.py
+'''
+Troi datrysiadau yn `dict`s syml (JSON).
+
+Mae'r mapiau `cyfuno_*` wedi'u bysellu gan wrthrychau `Nod`/`Odl`, felly
+mae'r rhain yn cael eu troi'n rhestrau [safle, gwerth], lle mae `safle`
+yn fynegai i `dat.nodau()` (acenion, cytseinedd) neu `dat.sillafau()`
+(odlau).
+'''
+
+
+def safleoedd(eitemau):
+    '''
+    `dict` id(eitem): safle. Mae `id` yn osgoi galw `__eq__` ar bob `Nod`.
+    '''
+    return {id(eitem): idx for idx, eitem in enumerate(eitemau)}
+
+
+def _map(cyfuno, safle):
+    return sorted([safle[id(key)], value] for key, value in cyfuno.items() if id(key) in safle)
+
+
+def toriadau(dat, safle):
+    '''
+    Safle'r nod ar ôl sillaf olaf pob corfan (h.y. lle mae'r toriad).
+    '''
+    def sillafau_olaf(uned):
+        if uned.lefel() == 1:
+            return [corfan.sillaf_olaf() for corfan in uned.children]
+        sillafau = []
+        for cydran in uned.children:
+            sillafau.extend(sillafau_olaf(cydran))
+        return sillafau
+
+    N = len(safle)
+    return [(safle[id(sillaf.nodau()[-1])] + 1) % N for sillaf in sillafau_olaf(dat)]
+
+
+def parau(dat, nodau, safle):
+    '''
+    Parau (idx, idx_nbr), idx < idx_nbr, o gytseiniaid cysylltiedig ac o
+    brif lafariaid sillafau sy'n odli. Mae `safle` (gweler `safleoedd`)
+    yn osgoi `nodau.index` ac `in nodau` (O(n) a `__eq__` ar bob `Nod`).
+    '''
+
+    # cytseiniaid (iteru dros nodau)
+    cysylltiadau = []
+    for idx, nod in enumerate(nodau):
+        for nbr in nod.neighbours or []:
+            idx_nbr = safle.get(id(nbr))
+            if idx_nbr is not None and idx_nbr > idx:
+                cysylltiadau.append((idx, idx_nbr))
+
+    # odlau (iteru dros sillafau)
+    odlau = []
+    for sillaf in dat.sillafau():
+        if not sillaf.odl().neighbours:
+            continue
+        idx = safle.get(id(sillaf.prif_lafariad()))
+        if idx is None:
+            continue
+        for nbr in sillaf.odl().neighbours:
+            idx_nbr = safle.get(id(nbr.parent.prif_lafariad()))
+            if idx_nbr is not None and idx_nbr > idx:
+                odlau.append((idx, idx_nbr))
+
+    return cysylltiadau, odlau
+
+
+def mapiau(dat):
+    '''
+    Labeli'r nodau a'r tri map `cyfuno_*` fel rhestrau [safle, gwerth].
+    '''
+    nodau = dat.nodau()
+    sillafau = dat.sillafau()
+
+    safle_nod = safleoedd(nodau)
+    safle_odl = safleoedd(sillaf.odl() for sillaf in sillafau)
+
+    return {
+        'nodau': [str(nod) for nod in nodau],
+        'acenion': _map(dat.cyfuno_acenion(), safle_nod),
+        'odlau': _map(dat.cyfuno_odlau(), safle_odl),
+        'cytseinedd': _map(dat.cyfuno_cytseinedd(), safle_nod),
+    }
+
+
+def graff(dat):
+    '''
+    Graff cryno'r olwyn (gweler `darlun.plot_complex`) i'w ddarlunio yn y
+    porwr: labeli'r nodau, safleoedd y toriadau, a'r ymylon fesul math
+    fel parau [idx, idx_nbr] o fynegeion i `nodau`.
+    '''
+    nodau = dat.nodau()
+    safle = safleoedd(nodau)
+    cytseinedd, odlau = parau(dat, nodau, safle)
+    return {
+        'nodau': [str(nod) for nod in nodau],
+        'toriadau': toriadau(dat, safle),
+        'ymylon': {
+            'cytseinedd': [list(par) for par in cytseinedd],
+            'odlau': [list(par) for par in odlau],
+        },
+    }
@@ -0,0 +1,128 @@
+# cyfrifon.py
+'''
+Cyfrifon y corpws i bob awdur (dosbarth, aceniad, cytseinedd) ar gyfer
+/ystadegau.
+
+Mae `diweddaru()` yn cael ei alw gan `create_mefus()` gyda chofnodion
+`corpws` ({slug: cerdd}). Mae MEFUS_CYFRIFON yn cadw cyfrifon pob cerdd
+(gyda'i `etag`) a chyfansymiau pob awdur:
+
+    {
+        'fersiwn': 1,
+        'cerddi': {slug: {'etag': ..., 'awdur': ..., 'cyfrif': {...}}},
+        'awduron': {awdur: {'cerddi': n, 'llinellau': n, 'dosbarth': {...},
+                            'aceniad': {...}, 'cytseinedd': {...}}},
+    }
+
+Dim ond cerddi newydd, rhai sydd wedi newid a rhai sydd wedi diflannu
+sy'n newid y cyfansymiau (tynnu'r hen gyfrif, ychwanegu'r newydd), felly
+does dim angen cyfrif y corpws cyfan eto. Mae `ciplun()` yn rhoi'r
+cyfansymiau i'r ap (wedi'u hail-ddarllen pan fo'r ffeil yn newid).
+'''
+
+import os
+import json
+from collections import Counter
+
+from .storfa import Ciplun, ysgrifennu
+from .settings import MEFUS_CYFRIFON
+
+
+FERSIWN = 1
+
+# meysydd y cyfrifon
+MEYSYDD = ('dosbarth', 'aceniad', 'cytseinedd')
+
+
+def cyfrif_cerdd(cerdd):
+    '''
+    Cyfrifon un gerdd (cofnod `corpws`).
+    '''
+    cyfrif = {
+        'cerddi': 1,
+        'llinellau': len(cerdd['llinellau']),
+    }
+    for maes in MEYSYDD:
+        cyfrif[maes] = Counter()
+    for rhes in cerdd['llinellau']:
+        if rhes['dosbarth']:
+            cyfrif['dosbarth'][rhes['dosbarth']] += 1
+        if rhes['aceniad']:
+            cyfrif['aceniad'][rhes['aceniad']] += 1
+        cyfrif['cytseinedd'].update(rhes['cytseinedd'])
+    for maes in MEYSYDD:
+        cyfrif[maes] = dict(cyfrif[maes])
+    return cyfrif
+
+
+def _ychwanegu(cyfanswm, cyfrif, arwydd=1):
+    # cyfanswm += arwydd*cyfrif (a dileu sero)
+    for key in ('cerddi', 'llinellau'):
+        cyfanswm[key] = cyfanswm.get(key, 0) + arwydd*cyfrif[key]
+    for maes in MEYSYDD:
+        rhan = cyfanswm.setdefault(maes, {})
+        for gwerth, nifer in cyfrif[maes].items():
+            rhan[gwerth] = rhan.get(gwerth, 0) + arwydd*nifer
+            if not rhan[gwerth]:
+                del rhan[gwerth]
+
+
+def darllen():
+    try:
+        with open(MEFUS_CYFRIFON) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get('fersiwn') != FERSIWN:
+        return None
+    return data
+
+
+def diweddaru(cerddi):
+    '''
+    Diweddaru MEFUS_CYFRIFON ar gyfer `cerddi` (cofnodion `corpws`).
+    Dychwelyd nifer y cerddi a newidiodd.
+    '''
+    data = darllen() or {'fersiwn': FERSIWN, 'cerddi': {}, 'awduron': {}}
+    hen = data['cerddi']
+    awduron = data['awduron']
+    newid = 0
+
+    # cerddi sydd wedi diflannu neu newid: tynnu'r hen gyfrif
+    for slug in list(hen):
+        cerdd = cerddi.get(slug)
+        if cerdd is not None and cerdd['etag'] == hen[slug]['etag'] and cerdd['awdur'] == hen[slug]['awdur']:
+            continue
+        rec = hen.pop(slug)
+        _ychwanegu(awduron.setdefault(rec['awdur'], {}), rec['cyfrif'], -1)
+        if not awduron[rec['awdur']].get('cerddi'):
+            del awduron[rec['awdur']]
+        newid += 1
+
+    # cerddi newydd (neu wedi newid): ychwanegu
+    for slug, cerdd in cerddi.items():
+        if slug in hen:
+            continue
+        cyfrif = cyfrif_cerdd(cerdd)
+        hen[slug] = {'etag': cerdd['etag'], 'awdur': cerdd['awdur'], 'cyfrif': cyfrif}
+        _ychwanegu(awduron.setdefault(cerdd['awdur'], {}), cyfrif)
+        newid += 1
+
+    if newid or not os.path.exists(MEFUS_CYFRIFON):
+        ysgrifennu(MEFUS_CYFRIFON, json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+    return newid
+
+
+def _llwytho():
+    data = darllen() or {'awduron': {}}
+    return {key: value for key, value in sorted(data['awduron'].items())}
+
+
+_ciplun = Ciplun(_llwytho)
+
+
+def ciplun():
+    '''
+    Cyfansymiau'r awduron ({awdur: {...}}, yn nhrefn yr wyddor).
+    '''
+    return _ciplun.get(MEFUS_CYFRIFON)
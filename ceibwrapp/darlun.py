@@ -1,239 +1,224 @@
 # darlun.py
 '''
 Creu darluniad o ddatrysiad drwy numpy a matplotlb.
+
+Mae mewnforio'r modiwl hwn yn drwm (matplotlib, ac yna geomstats ar
+gyfer y darlun hyperbolic), felly dim ond `oriel` a `gweithwyr` sy'n ei
+fewnforio, a hynny y tro cyntaf mae angen darlun. Mae `rhaglwytho()` yn
+talu'r gost ymlaen llaw (gweler DARLUN_RHAGLWYTHO).
 '''
 
 import os
 
 import numpy as np
-import matplotlib.pyplot as plt
 import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.patches import Circle
+from matplotlib.collections import LineCollection
 matplotlib.use('agg')
 
 
-import cmath as cm
 from datetime import datetime
 
-from ceibwr.peiriant import Peiriant
+from ceibwrapp.peiriannau import peiriant
 from ceibwr.datrysiad import Datrysiad
 
-# hyperbolic model
-import geomstats.backend as gs
-import geomstats.visualization as visualization
-from geomstats.geometry.hyperboloid import Hyperboloid
-
 from ceibwrapp.settings import TMP_FOLDER
+from ceibwrapp.cyfresu import safleoedd, toriadau, parau
 
-plt.rcParams['font.family'] = 'monospace'
+matplotlib.rcParams['font.family'] = 'monospace'
 
 
-def plot(dat, hyperbolic=False, ndots=500):
+def plot(dat, hyperbolic=False, ndots=500, fname=None, allbwn=None, fformat='svg'):
+    '''
+    Darlunio `dat`. Heb `allbwn` mae'r darlun yn cael ei gadw yn
+    TMP_FOLDER ac mae enw'r ffeil yn cael ei ddychwelyd; gydag `allbwn`
+    (e.e. `io.BytesIO`) mae'n cael ei ysgrifennu i hwnnw yn lle, heb
+    gyffwrdd â'r ddisg.
 
+    Mae pob darlun yn `Figure` ei hun (dim `pyplot`), felly does dim
+    cyflwr byd-eang rhwng edafedd a dim ffigurau'n cronni yn y cof.
+    '''
+    kwargs = {'ndots': ndots, 'fname': fname, 'allbwn': allbwn, 'fformat': fformat}
     if hyperbolic:
-        return plot_hyperbolic(dat, ndots=ndots)
+        return plot_hyperbolic(dat, **kwargs)
     else:
-        return plot_complex(dat, ndots=ndots)
+        return plot_complex(dat, **kwargs)
+
+
+def _cadw(fig, prefix, fname=None, allbwn=None, fformat='svg', **kwargs):
+    # ysgrifennu i `allbwn` neu i ffeil yn TMP_FOLDER, yna rhyddhau'r ffigur
+    try:
+        fig.tight_layout()
+        if allbwn is not None:
+            fig.savefig(allbwn, format=fformat, **kwargs)
+            return allbwn
+
+        if fname is None:
+            timestamp = datetime.timestamp(datetime.now())
+            fname = prefix + str(timestamp) + '.' + fformat
+        fig.savefig(os.path.join(TMP_FOLDER, fname), format=fformat, **kwargs)
+        return fname
+    finally:
+        fig.clear()
+
+
+def rhaglwytho():
+    '''
+    Mewnforio geomstats a llwytho'r ffontiau (drwy ddarlunio ffigur bach),
+    fel nad yw'r darlun cyntaf yn talu'r gost.
+    '''
+    import io
+    from geomstats.geometry.hyperboloid import Hyperboloid
+    Hyperboloid(dim=2)
+
+    fig = Figure()
+    ax = fig.subplots()
+    ax.text(0, 0, 'ceibwr')
+    _cadw(fig, 'rhaglwytho-', allbwn=io.BytesIO())
 
 
-def plot_hyperbolic(dat, ndots=100):
+def plot_hyperbolic(dat, ndots=100, fname=None, allbwn=None, fformat='svg'):
 
     # init figure
-    fig = plt.figure(figsize=(6, 6))
-    ax = plt.gca()
+    fig = Figure(figsize=(6, 6))
+    ax = fig.subplots()
 
-    # init hyperboloid
+    # init hyperboloid (geomstats yn cael ei fewnforio fan hyn yn unig)
+    import geomstats.backend as gs
+    from geomstats.geometry.hyperboloid import Hyperboloid
     h2 = Hyperboloid(dim=2)
 
     # atoms
     nodau = dat.nodau()
-    sillafau = dat.sillafau()
 
     # print('nodau:', nodau)
-    # print('sillafau:', sillafau)
 
     # plot outer circle (nodau)
-    # mae'n debyg nad yw `visualisation` yn caniatau text
-    # felly mae hwn yn defynddio dot mawr du am bob llythyren
+    # dot mawr du am bob llythyren (fel `geomstats.visualization`, ond
+    # heb `pyplot`)
     N = len(nodau)
     R = 40  # radius (???)
     dtheta = 2*np.pi/N
     pts = np.array([[R*np.sin(z), R*np.cos(z)] for z in np.arange(-np.pi/2, 3*np.pi/2, dtheta)])
     pts_int = gs.array(pts)
     pts_ext = h2.from_coordinates(pts_int, "intrinsic")
-    visualization.plot(
-        pts_ext,
-        ax=ax,
-        space="H2_poincare_disk",
-        marker=".",
-        color="black",
-    )
-
-    # arcs rhwng cytseiniaid (iteru dros nodau)
-    for idx, nod in enumerate(nodau):
-        if nod.neighbours:
-            for nbr in nod.neighbours:
-                idx_nbr = nodau.index(nbr)
-                if idx_nbr > idx:
-                    # print(idx, idx_nbr)
-                    src = pts_ext[idx]
-                    dst = pts_ext[idx_nbr]
-                    # print('(src, dst):', (src, dst))
-                
-                    # disk model
-                    tangent_vec = h2.metric.log(point=dst, base_point=src)
-                    geodesic = h2.metric.geodesic(initial_point=src, initial_tangent_vec=tangent_vec)
-                
-                    arc_points = []
-                    t = gs.linspace(0.0, 1.0, ndots)
-                    arc_points.append(geodesic(t))
-                    arc_points = gs.vstack(arc_points)
-                    visualization.plot(
-                        arc_points,
-                        ax=ax,
-                        space="H2_poincare_disk",
-                        marker=".",
-                        label=str('({}, {})'.format(nod, nbr))
-                    )        
-
-    # arcs rhwng odlau (iteru dros sillafau)
-    for sillaf in sillafau:
-
-        if sillaf.odl().neighbours:
-            prif = sillaf.prif_lafariad()
-            if prif not in nodau:
-                continue
-            idx = nodau.index(prif)
-
-            for nbr in sillaf.odl().neighbours:
-                nbr_prif = nbr.parent.prif_lafariad()
-                if nbr_prif not in nodau:
-                    continue
-                idx_nbr = nodau.index(nbr_prif)
-
-                if idx_nbr > idx:
-                    # print(idx, idx_nbr)
-                    src = pts_ext[idx]
-                    dst = pts_ext[idx_nbr]
-                    # print('(src, dst):', (src, dst))
-
-                    # disk model
-                    tangent_vec = h2.metric.log(point=dst, base_point=src)
-                    geodesic = h2.metric.geodesic(initial_point=src, initial_tangent_vec=tangent_vec)
-
-                    arc_points = []
-                    t = gs.linspace(0.0, 1.0, ndots)
-                    arc_points.append(geodesic(t))
-                    arc_points = gs.vstack(arc_points)
-                    visualization.plot(
-                        arc_points,
-                        ax=ax,
-                        space="H2_poincare_disk",
-                        marker=".",
-                        label=str('({}, {})'.format(sillaf.odl(), nbr))
-                    )
+    pts_disk = _poincare(pts_ext)
+    ax.add_patch(Circle((0, 0), radius=1.0, color="black", fill=False))
+    ax.scatter(pts_disk[:, 0], pts_disk[:, 1], marker=".", color="black")
+    ax.set(xlim=(-1.2, 1.2), ylim=(-1.2, 1.2), xlabel="X", ylabel="Y")
+
+    # arcs rhwng cytseiniaid ac odlau (pob geodesig ar unwaith)
+    cysylltiadau, odlau = parau(dat, nodau, safleoedd(nodau))
+    ymylon = cysylltiadau + odlau
+    if ymylon:
+        arcs = _geodesigau(h2, pts_ext, np.array(ymylon), ndots=ndots)
+        lliwiau = ['C{}'.format(i % 10) for i in range(len(arcs))]
+        ax.add_collection(LineCollection(arcs, colors=lliwiau, linewidths=2))
 
     # tweak
     # ax.legend(loc="center right")
     ax.set_aspect('equal')
 
-    timestamp = datetime.timestamp(datetime.now())
-    fname = 'olwyn-hyperbolic-' + str(timestamp) + ".svg"
-    fname_fullpath = os.path.join(TMP_FOLDER, fname)
+    return _cadw(fig, 'olwyn-hyperbolic-', fname, allbwn, fformat, bbox_inches='tight')
+
+
+def _geodesigau(h2, pts_ext, ymylon, ndots=100):
+    '''
+    Geodesigau rhwng parau o bwyntiau ar yr hyperboloid, wedi'u taflunio i
+    ddisg Poincaré: arae (n, ndots, 2). Un galwad `log` ac un galwad `exp`
+    ar gyfer pob arc gyda'i gilydd.
+    '''
+    import geomstats.backend as gs
+
+    src = pts_ext[ymylon[:, 0]]
+    dst = pts_ext[ymylon[:, 1]]
+    tangent_vecs = h2.metric.log(point=dst, base_point=src)  # (n, 3)
+
+    t = gs.linspace(0.0, 1.0, ndots)
+    n = len(ymylon)
+    base = gs.repeat(src, ndots, axis=0)  # (n*ndots, 3)
+    vecs = gs.reshape(t[None, :, None]*tangent_vecs[:, None, :], (n*ndots, 3))
+    arc_points = h2.metric.exp(tangent_vec=vecs, base_point=base)
+
+    return np.reshape(_poincare(arc_points), (n, ndots, 2))
+
+
+def _poincare(points):
+    # hyperboloid -> disg Poincaré
+    return points[:, 1:]/(1 + points[:, :1])
 
-    fig.tight_layout()
-    plt.savefig(fname_fullpath, bbox_inches='tight')
 
-    return fname
+def _arcs(z1, z2, ndots=500):
+    '''
+    Arcs (geodesics y Poincaré disc) rhwng parau o bwyntiau `z1[k]`,
+    `z2[k]` ar y cylch uned, i gyd ar unwaith. Allbwn: (n, ndots, 2).
+    '''
 
+    # midpt
+    z = (z1 + z2)/2
 
-def plot_complex(dat,  olwyn_nodau=True, ndots=1000):
+    # pwyntiau gyferbyn: llinell syth drwy'r canol
+    syth = np.abs(z) < 1e-9
+    z = np.where(syth, 1, z)
+
+    # invert
+    zinv = 1/z.conjugate()
+    rinv = np.abs(z1 - zinv)
+
+    # args
+    theta1 = np.angle(z1 - zinv)
+    theta2 = np.angle(z2 - zinv)
+
+    # magic
+    theta2 = np.where((theta1 > theta2) & (np.abs(theta2 - theta1) > np.pi), theta2 + 2*np.pi, theta2)
+
+    t = np.linspace(0, 1, ndots)
+    args = theta1[:, None] + (theta2 - theta1)[:, None]*t
+    pts = zinv[:, None] + rinv[:, None]*np.exp(1j*args)
+    pts[syth] = z1[syth, None] + (z2 - z1)[syth, None]*t
+
+    return np.stack([pts.real, pts.imag], axis=-1)
+
+
+def plot_complex(dat,  olwyn_nodau=True, ndots=1000, fname=None, allbwn=None, fformat='svg'):
 
     # init figure
-    # fig = plt.figure(figsize=(6,6))
-    # ax = plt.gca()
-    # ax.cla()  # clear for fresh plot
-    fig, ax = plt.subplots()
+    fig = Figure()
+    ax = fig.subplots()
 
     # atoms
     nodau = dat.nodau()
-    sillafau = dat.sillafau()
 
     # print('nodau:', nodau)
-    # print('sillafau:', sillafau)
 
     # theta = np.linspace(0, 2*np.pi, len(nodau))  # anticlockwise
     theta = np.linspace(np.pi, -np.pi, len(nodau))  # clockwise
 
     # complex coords
-    zpts = [complex(np.cos(arg), np.sin(arg)) for arg in theta]
-
-    # compute toriadau (sillafau blaenorol)
-    def toriadau(dat):
-        if dat.lefel() == 1:
-            return [corfan.sillaf_olaf() for corfan in dat.children]
-        sillafau = []
-        for cydran in dat.children:
-            sillafau.extend(toriadau(cydran))
-        return sillafau
-
-    # helper function
-    def plot_arc(ax, z1, z2, markersize=4, label=None, ndots=500):
-        
-        # midpt
-        z = (z1 + z2)/2
-        # r = abs(z1 - z)
-        
-        # invert
-        zinv = 1/z.conjugate()
-        rinv = abs(z1 - zinv)
-
-        # args
-        theta1 = cm.phase(z1 - zinv)
-        theta2 = cm.phase(z2 - zinv)
-
-        # magic
-        if theta1 > theta2 and abs(theta2 - theta1) > np.pi:
-            theta2 = theta2 + 2*np.pi
-
-        args = np.linspace(theta1, theta2, ndots)
-        xpts = zinv.real + rinv*np.cos(args)
-        ypts = zinv.imag + rinv*np.sin(args)
-        ax.plot(xpts, ypts, '.', markersize=markersize, label=label)
+    zpts = np.exp(1j*theta)
+
+    # safle pob nod (unwaith)
+    safle = safleoedd(nodau)
 
     # rim & spokes
     ax.plot(np.cos(theta), np.sin(theta), color='0.8', linestyle='dashed')
-    for sillaf in toriadau(dat):
-        idx = nodau.index(sillaf.nodau()[-1]) + 1
+    for idx in toriadau(dat, safle):
         ax.plot([0, zpts[idx].real], [0, zpts[idx].imag], color='0.8', linestyle='dashed')
 
-    # connect cytseiniaid
-    for idx, nod in enumerate(nodau):
-        if nod.neighbours:
-            for nbr in nod.neighbours:
-                idx_nbr = nodau.index(nbr)
-                if idx_nbr > idx:
-
-                    label = str('{} - {}'.format(str(nod), str(nbr)))
-                    plot_arc(ax, zpts[idx], zpts[idx_nbr], ndots=ndots, label=label)
-
-    # connect sillafau
-    for sillaf in sillafau:
-
-        if sillaf.odl().neighbours:
-            prif = sillaf.prif_lafariad()
-            if prif not in nodau:
-                continue
-            idx = nodau.index(prif)
+    # connect cytseiniaid & sillafau
+    cysylltiadau, odlau = parau(dat, nodau, safle)
 
-            for nbr in sillaf.odl().neighbours:
-                nbr_prif = nbr.parent.prif_lafariad()
-                if nbr_prif not in nodau:
-                    continue
-                idx_nbr = nodau.index(nbr_prif)
-
-                if idx_nbr > idx:
-                    label = str('{} - {}'.format(str(sillaf.odl()), str(nbr)))
-                    plot_arc(ax, zpts[idx], zpts[idx_nbr], ndots=ndots, label=label)
+    # un LineCollection i bob math (lliwiau'n dilyn y cylch arferol)
+    lliw = 0
+    for ymylon in (cysylltiadau, odlau):
+        if not ymylon:
+            continue
+        ymylon = np.array(ymylon)
+        arcs = _arcs(zpts[ymylon[:, 0]], zpts[ymylon[:, 1]], ndots=ndots)
+        lliwiau = ['C{}'.format((lliw + i) % 10) for i in range(len(arcs))]
+        ax.add_collection(LineCollection(arcs, colors=lliwiau, linewidths=2))
+        lliw += len(arcs)
 
     # plot olwyn nodau
     if olwyn_nodau:
@@ -252,14 +237,7 @@ def plot_complex(dat,  olwyn_nodau=True, ndots=1000):
     ax.axis('off')
     # ax.legend(loc=(1.1, 0), markerscale=4)
 
-    timestamp = datetime.timestamp(datetime.now())
-    fname = 'olwyn-complex-' + str(timestamp) + ".svg"
-    fname_fullpath = os.path.join(TMP_FOLDER, fname)
-
-    fig.tight_layout()
-    plt.savefig(fname_fullpath)
-
-    return fname
+    return _cadw(fig, 'olwyn-complex-', fname, allbwn, fformat)
 
 
 def main():
@@ -297,16 +275,16 @@ def main():
     # fname = 'olwyn-' + str(timestamp) + ".svg"
     # # fname = 'olwyn-' + str(timestamp) + ".png"
     
-    pe = Peiriant()
-    meta, uned = pe.parse(s)
-    dat = pe.datryswr(uned)
-    dat.set_nbrs()
+    with peiriant() as pe:
+        meta, uned = pe.parse(s)
+        dat = pe.datryswr(uned)
+        dat.set_nbrs()
 
     fname = plot(dat, ndots=500)
     print(fname)
 
     # fname = 'olwyn-hyperbolic-' + str(timestamp) + ".svg"
-    fname = plot(s, hyperbolic=True, ndots=100)
+    fname = plot(dat, hyperbolic=True, ndots=100)
     print(fname)
 
 
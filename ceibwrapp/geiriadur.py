@@ -0,0 +1,121 @@
+# geiriadur.py
+'''
+Geiriadur yr odliadur a'r cleciadur, a rhannu geiriau'n gytseiniaid a
+llafariaid ar gyfer eu mynegeion (`mynegai_odlau`, `mynegai_clecs`).
+
+Mae'r geiriau'n cael eu darllen o GEIRIADUR_FFEIL (un gair i bob
+llinell) unwaith i bob proses. Os nad yw'r ffeil yn bodoli mae
+`geiriau()` yn wag, ac mae'r mynegeion yn troi'n ôl at `odl_search` a
+`clec_search`.
+
+Mae'r rhannu'n fras: mae `w` ac `y` yn llafariaid (ond `w`/`i` rhwng
+dwy lafariad yn gytsain), ac mae'r acen ar y goben oni bai mai un sillaf
+sydd i'r gair olaf.
+'''
+
+import threading
+
+from .settings import GEIRIADUR_FFEIL
+
+
+LLAFARIAID = frozenset('aeiouwy' 'âêîôûŵŷ' 'áéíóúẃý' 'àèìòùẁỳ' 'äëïöüẅÿ')
+DEUGRAFFAU = ('ch', 'dd', 'ff', 'ng', 'll', 'ph', 'rh', 'th')
+
+_lock = threading.Lock()
+_geiriau = None
+
+
+def geiriau():
+    '''
+    Geiriau GEIRIADUR_FFEIL yn nhrefn yr wyddor (`tuple`), neu `()`.
+    '''
+    global _geiriau
+    with _lock:
+        if _geiriau is None:
+            try:
+                with open(GEIRIADUR_FFEIL, encoding='utf-8') as f:
+                    _geiriau = tuple(sorted({ll.strip() for ll in f if ll.strip() and not ll.startswith('#')}))
+            except OSError:
+                _geiriau = ()
+        return _geiriau
+
+
+def llythrennau(testun):
+    '''
+    Llythrennau `testun` (llythrennau bach, deugraffau'n un llythyren).
+    '''
+    testun = ''.join(c for c in testun.lower() if c.isalpha())
+    llythrennau = []
+    idx = 0
+    while idx < len(testun):
+        if testun[idx:idx + 2] in DEUGRAFFAU:
+            llythrennau.append(testun[idx:idx + 2])
+            idx += 2
+        else:
+            llythrennau.append(testun[idx])
+            idx += 1
+    return llythrennau
+
+
+def rhannau(testun):
+    '''
+    Grwpiau cytseiniaid a llafariaid bob yn ail (`tuple` o lythrennau):
+    [C0, L1, C1, L2, C2, ..., Ln, Cn], lle mae `n` yn nifer y sillafau
+    (gall C0 a Cn fod yn wag).
+    '''
+    llythrennau_ = llythrennau(testun)
+    grwpiau = [[]]
+    llafariad = False
+    for idx, llythyren in enumerate(llythrennau_):
+        ll = llythyren in LLAFARIAID
+        if llythyren in 'wi' and 0 < idx < len(llythrennau_) - 1:
+            # rhwng dwy lafariad mae `w`/`i` yn gytsain (ta-wel, De-wi)
+            ll = not (llythrennau_[idx - 1] in LLAFARIAID and llythrennau_[idx + 1] in LLAFARIAID)
+        if ll != llafariad:
+            grwpiau.append([])
+            llafariad = not llafariad
+        grwpiau[-1].append(llythyren)
+    if llafariad:
+        grwpiau.append([])
+    return [tuple(grwp) for grwp in grwpiau]
+
+
+def nifer_sillafau(testun):
+    return (len(rhannau(testun)) - 1)//2
+
+
+def odlau(gair):
+    '''
+    (odl y sillaf olaf, odl y goben neu `None`, nifer sillafau): llafariaid
+    sillaf a'r cytseiniaid sy'n ei dilyn, e.e. 'calon' -> ('on', 'al', 2).
+    '''
+    grwpiau = rhannau(gair)
+    n = (len(grwpiau) - 1)//2
+    if not n:
+        return None, None, 0
+    olaf = ''.join(grwpiau[-2] + grwpiau[-1])
+    goben = ''.join(grwpiau[-4] + grwpiau[-3]) if n > 1 else None
+    return olaf, goben, n
+
+
+def sgerbwd(testun):
+    '''
+    (blaen, acennog, wedyn) ar gyfer cytseinedd: cytseiniaid `testun` cyn y
+    llafariad acennog (`blaen`) a rhwng honno a'r llafariad nesaf (`wedyn`),
+    heb `h`. `None` os nad oes llafariad.
+    '''
+    geiriau_ = testun.split()
+    if not geiriau_:
+        return None
+    grwpiau = rhannau(''.join(geiriau_))
+    n = (len(grwpiau) - 1)//2
+    if not n:
+        return None
+
+    acennog = nifer_sillafau(geiriau_[-1]) <= 1
+    sillaf = n if acennog or n == 1 else n - 1
+    safle = 2*sillaf - 1  # y llafariad acennog yn `grwpiau`
+
+    blaen = tuple(ll for grwp in grwpiau[0:safle:2] for ll in grwp if ll != 'h')
+    wedyn = tuple(ll for ll in grwpiau[safle + 1] if ll != 'h')
+    return blaen, acennog, wedyn
@@ -0,0 +1,371 @@
+# gweithwyr.py
+'''
+Prosesau gweithwyr ar gyfer gwaith trwm yr ap (datrys swp o linellau).
+
+Mae'r gronfa'n cael ei chreu y tro cyntaf mae ei hangen. Mae pob
+proses yn cynhesu ei `Peiriant` ei hun (`peiriannau.cynhesu`).
+Defnyddir `spawn` yn hytrach na `fork` gan fod edafedd eraill (e.e. yr
+adeiladwr mefus) yn rhedeg yn y broses sy'n creu'r gronfa.
+'''
+
+import os
+import re
+import time
+import base64
+import signal
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+from .peiriannau import peiriant, cynhesu
+from .cyfresu import mapiau
+from .cryno import cyfresu as cyfresu_cryno
+from .settings import GWEITHWYR_PROSESAU, GWEITHWYR_GRAS, GWEITHWYR_POLL, PYSGOTA_DARN, PYSGOTA_AR_WAITH, DARLUN_MODD
+
+
+_pool = None
+_lock = threading.Lock()
+
+# mae gweithwyr (pob cronfa) yn anfon (tocyn, amser, pid) i'r ciw hwn pan
+# fo eitem `swp` yn cychwyn go iawn; mae edefyn yn y broses hon yn eu
+# cofnodi yn `_dechrau`
+_ciw = None
+_dechrau = {}
+_tocynnau = itertools.count()
+
+# cronfeydd wedi ymddeol gyda gweithwyr sownd: {cronfa: {future: pid}}
+_sownd = {}
+
+
+class TerfynAmser(Exception):
+    pass
+
+
+def _cychwyn_gweithiwr(ciw):
+    # initializer pob proses yn y gronfa
+    global _ciw
+    _ciw = ciw
+    cynhesu()
+
+
+def _gwrando(ciw):
+    while True:
+        neges = ciw.get()
+        if neges is None:
+            return
+        tocyn, amser, pid = neges
+        _dechrau[tocyn] = (amser, pid)
+
+
+def pool():
+    global _pool, _ciw
+    with _lock:
+        if _pool is None:
+            ctx = multiprocessing.get_context('spawn')
+            if _ciw is None:
+                _ciw = ctx.SimpleQueue()
+                threading.Thread(target=_gwrando, args=(_ciw,), name='gweithwyr-dechrau', daemon=True).start()
+            _pool = ProcessPoolExecutor(
+                max_workers=GWEITHWYR_PROSESAU,
+                mp_context=ctx,
+                initializer=_cychwyn_gweithiwr,
+                initargs=(_ciw,),
+            )
+        return _pool
+
+
+def ailgychwyn(hen=None):
+    '''
+    Taflu'r gronfa (e.e. ar ôl `BrokenProcessPool`); bydd `pool()` yn
+    creu un newydd. Gyda `hen`, dim ond os mai honno yw'r gronfa o hyd
+    (fel nad yw sawl cais yn taflu cronfa newydd ei gilydd).
+    '''
+    global _pool
+    with _lock:
+        if _pool is None or (hen is not None and _pool is not hen):
+            return
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def ymddeol(hen, fut, pid):
+    '''
+    Gweithiwr `pid` yn sownd ar `fut` yn y gronfa `hen`. Mae gwaith newydd
+    yn mynd i gronfa newydd ar unwaith, ond mae gweddill gwaith `hen`
+    (ceisiadau a thasgau eraill) yn cael gorffen cyn i'r gweithwyr sownd
+    gael eu lladd (mae lladd un yn torri'r gronfa gyfan).
+    '''
+    global _pool
+    with _lock:
+        if _pool is hen:
+            _pool = None
+        sownd = _sownd.setdefault(hen, {})
+        cyntaf = not sownd
+        sownd[fut] = pid
+    if cyntaf:
+        hen.shutdown(wait=False)
+        threading.Thread(target=_lladd_sownd, args=(hen,), name='gweithwyr-sownd', daemon=True).start()
+
+
+def _lladd_sownd(hen):
+    # aros i waith arall `hen` orffen, yna lladd y gweithwyr sownd
+    while True:
+        with _lock:
+            sownd = dict(_sownd[hen])
+        eraill = [item.future for item in list(hen._pending_work_items.values()) if item.future not in sownd]
+        if all(fut.done() for fut in eraill):
+            break
+        time.sleep(GWEITHWYR_POLL)
+
+    pids = set(sownd.values())
+    for proses in list((hen._processes or {}).values()):
+        if proses.pid in pids:
+            proses.terminate()
+    with _lock:
+        del _sownd[hen]
+
+
+def _rhedeg(tocyn, terfyn, ffwythiant, eitem, kwargs):
+    # yn y gweithiwr: cofnodi'r dechrau a gosod larwm `terfyn` eiliad
+    if _ciw is not None:
+        _ciw.put((tocyn, time.monotonic(), os.getpid()))
+
+    larwm = terfyn and hasattr(signal, 'setitimer')
+    if larwm:
+        def codi(signum, frame):
+            raise TerfynAmser('terfyn amser ({} eiliad)'.format(terfyn))
+        hen = signal.signal(signal.SIGALRM, codi)
+        signal.setitimer(signal.ITIMER_REAL, terfyn)
+    try:
+        return ffwythiant(eitem, **kwargs)
+    finally:
+        if larwm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, hen)
+
+
+def swp(ffwythiant, eitemau, terfyn=None, **kwargs):
+    '''
+    Rhedeg `ffwythiant(eitem, **kwargs)` ar bob eitem yn y gronfa, gan
+    gynhyrchu (idx, canlyniad, gwall) wrth i bob un orffen (nid yn eu
+    trefn). Dim ond GWEITHWYR_PROSESAU eitem sydd ar y gweill ar y tro.
+
+    Mae `terfyn` (eiliadau) yn cyfri o'r adeg y mae gweithiwr yn codi'r
+    eitem (nid o'r adeg y mae'n cael ei chyflwyno, gan fod y gronfa'n cael
+    ei rhannu): mae larwm yn y gweithiwr yn ei hatal ac mae'n cael ei
+    hadrodd fel gwall. Os nad yw'r gweithiwr yn ymateb o fewn GWEITHWYR_GRAS
+    eiliad arall (yn sownd mewn cod C), mae'r gronfa'n ymddeol (`ymddeol`):
+    mae gwaith newydd yn mynd i gronfa newydd a'r gweithiwr sownd yn cael
+    ei ladd unwaith mae gwaith pawb arall ynddi wedi gorffen.
+    '''
+    eitemau = iter(enumerate(eitemau))
+    ar_waith = {}  # future: (idx, tocyn, pool)
+
+    def cyflwyno():
+        while len(ar_waith) < GWEITHWYR_PROSESAU:
+            try:
+                idx, eitem = next(eitemau)
+            except StopIteration:
+                return
+            tocyn = next(_tocynnau)
+            pool_ = pool()
+            ar_waith[pool_.submit(_rhedeg, tocyn, terfyn, ffwythiant, eitem, kwargs)] = (idx, tocyn, pool_)
+
+    def timeout():
+        if not terfyn:
+            return None
+        nawr = time.monotonic()
+        diweddau = [
+            _dechrau[tocyn][0] + terfyn + GWEITHWYR_GRAS - nawr
+            for idx, tocyn, _ in ar_waith.values() if tocyn in _dechrau
+        ]
+        return max(min(diweddau + [GWEITHWYR_POLL]), 0)
+
+    try:
+        cyflwyno()
+        while ar_waith:
+            done, _ = wait(ar_waith, timeout=timeout(), return_when=FIRST_COMPLETED)
+
+            for fut in done:
+                idx, tocyn, pool_ = ar_waith.pop(fut)
+                _dechrau.pop(tocyn, None)
+                try:
+                    yield idx, fut.result(), None
+                except TerfynAmser as err:
+                    yield idx, None, str(err)
+                except BrokenProcessPool as err:
+                    ailgychwyn(pool_)
+                    yield idx, None, '{}: {}'.format(type(err).__name__, err)
+                except Exception as err:
+                    yield idx, None, '{}: {}'.format(type(err).__name__, err)
+
+            # gweithiwr sownd: ymddeol y gronfa
+            if terfyn:
+                nawr = time.monotonic()
+                for fut, (idx, tocyn, pool_) in list(ar_waith.items()):
+                    dechrau = _dechrau.get(tocyn)
+                    if dechrau and nawr > dechrau[0] + terfyn + GWEITHWYR_GRAS and not fut.done():
+                        del ar_waith[fut]
+                        _dechrau.pop(tocyn, None)
+                        ymddeol(pool_, fut, dechrau[1])
+                        yield idx, None, 'terfyn amser ({} eiliad)'.format(terfyn)
+
+            cyflwyno()
+
+    finally:
+        # cleient wedi mynd?
+        for fut, (idx, tocyn, pool_) in ar_waith.items():
+            fut.cancel()
+            _dechrau.pop(tocyn, None)
+
+
+def datrys_json(s, xml=False, cryno=False):
+    '''
+    Datrys `s` a dychwelyd `dict` JSON: meta, dosbarth, nodau, a'r mapiau
+    `cyfuno_*` (gweler `cyfresu.mapiau`), gydag `xml` a/neu'r datrysiad
+    cyfan yn y fformat cryno (`cryno.cyfresu`) os oes angen.
+    '''
+    with peiriant() as pe:
+        meta, uned = pe.parse(s)
+        dat = pe.datryswr(uned, unigol=True)
+        dat.set_nbrs()
+
+    canlyniad = {
+        'meta': meta,
+        'dosbarth': dat.dosbarth,
+    }
+    canlyniad.update(mapiau(dat))
+    if xml:
+        canlyniad['xml'] = dat.xml_str()
+    if cryno:
+        canlyniad['cryno'] = cyfresu_cryno(dat, meta)
+    return canlyniad
+
+
+def pysgota_darn(testun, min_sillafau=4, max_sillafau=8):
+    with peiriant() as pe:
+        return pe.pysgotwr(testun, min_sillafau=min_sillafau, max_sillafau=max_sillafau)
+
+
+def _allwedd(dat):
+    return ''.join(str(nod) for nod in dat.nodau())
+
+
+def _normaleiddio(s):
+    return ''.join(c for c in s.lower() if c.isalnum())
+
+
+def _safleoedd(geiriau, dalfa):
+    '''
+    Safle (rhif gair yn `geiriau`) dechrau pob dalfa, neu `None`. Mae'r
+    pysgotwr yn rhoi'r ddalfa yn nhrefn y testun, felly mae'r chwilio'n
+    dechrau o'r safle blaenorol (mae llinell sy'n cael ei hailadrodd yn
+    cael ei safle ei hun).
+    '''
+    geiriau = [_normaleiddio(gair) for gair in geiriau]
+    safle = 0
+    for dat in dalfa:
+        allwedd = _normaleiddio(_allwedd(dat))
+        canfod = None
+        for idx in itertools.chain(range(safle, len(geiriau)), range(0, safle)):
+            testun = ''
+            jdx = idx
+            while len(testun) < len(allwedd) and jdx < len(geiriau):
+                testun += geiriau[jdx]
+                jdx += 1
+            if allwedd and testun.startswith(allwedd):
+                canfod = idx
+                break
+        if canfod is not None:
+            safle = canfod
+        yield canfod
+
+
+def pysgota(s, min_sillafau=4, max_sillafau=8, maint=PYSGOTA_DARN):
+    '''
+    `pysgotwr` ar destun hir: rhannu `s` yn ddarnau o `maint` gair, eu
+    pysgota yn y gronfa, a chynhyrchu'r ddalfa fesul darn (yn eu trefn)
+    cyn gynted ag y mae pob un yn barod. Dim ond PYSGOTA_AR_WAITH darn
+    sydd yn y gronfa ar y tro, fel nad yw un testun hir yn llenwi'r ciw.
+
+    Mae pob darn yn gorgyffwrdd â'r nesaf o `max_sillafau` gair (mae gan
+    bob gair o leiaf un sillaf), felly does dim ffenest yn cael ei
+    cholli. Mae darnau'n cadw'r testun gwreiddiol (gan gynnwys diwedd
+    llinellau). Mae pob dalfa'n perthyn i'r darn lle mae'n dechrau yn
+    ei `maint` gair cyntaf; mae dalfeydd sy'n dechrau yn y gorgyffwrdd ar
+    y diwedd yn cael eu hepgor (mae'r darn nesaf yn eu dal).
+    '''
+    geiriau = list(re.finditer(r'\S+', s))
+    if len(geiriau) <= maint + max_sillafau:
+        yield from pysgota_darn(s, min_sillafau, max_sillafau)
+        return
+
+    darnau = []
+    for idx in range(0, len(geiriau), maint):
+        darn = geiriau[idx:idx + maint + max_sillafau]
+        darnau.append((s[darn[0].start():darn[-1].end()], [gair.group() for gair in darn]))
+
+    darnau_iter = iter(darnau)
+    ar_waith = []  # (future, pool)
+
+    def cyflwyno():
+        while len(ar_waith) < PYSGOTA_AR_WAITH:
+            try:
+                testun, _ = next(darnau_iter)
+            except StopIteration:
+                return
+            pool_ = pool()
+            ar_waith.append((pool_.submit(pysgota_darn, testun, min_sillafau, max_sillafau), pool_))
+
+    try:
+        cyflwyno()
+        for rhif, (_, geiriau_darn) in enumerate(darnau):
+            fut, pool_ = ar_waith.pop(0)
+            try:
+                dalfa = fut.result()
+            except BrokenProcessPool as err:
+                ailgychwyn(pool_)
+                print('PYSGOTA:', type(err).__name__, err)
+                return
+            except Exception as err:
+                print('PYSGOTA:', type(err).__name__, err)
+                dalfa = []
+            cyflwyno()
+
+            olaf = rhif == len(darnau) - 1
+            for dat, safle in zip(dalfa, _safleoedd(geiriau_darn, dalfa)):
+                if olaf or safle is None or safle < maint:
+                    yield dat
+
+    finally:
+        for fut, _ in ar_waith:
+            fut.cancel()
+
+
+def pysgota_json(s, min_sillafau=4, max_sillafau=8):
+    '''
+    Fel `datrys_json`, ond rhestr o'r ddalfa.
+    '''
+    dalfa = []
+    for dat in pysgota_darn(s, min_sillafau, max_sillafau):
+        canlyniad = {'dosbarth': dat.dosbarth}
+        canlyniad.update(mapiau(dat))
+        dalfa.append(canlyniad)
+    return dalfa
+
+
+def darlunio_json(s, dtype='hyperbolic'):
+    '''
+    Datrys `s` a'i ddarlunio (gweler `oriel`). Dychwelyd enw'r ffeil yn
+    TMP_FOLDER, neu yn y modd 'cof' y beit eu hunain (base64, gan fod
+    y broses hon yn wahanol i'r ap).
+    '''
+    from . import oriel
+
+    if DARLUN_MODD == 'cof':
+        fname, data = oriel.darlunio_cof(s, dtype)
+        return {'dtype': dtype, 'ffeil': fname, 'data': base64.b64encode(data).decode('ascii')}
+
+    return {'dtype': dtype, 'ffeil': oriel.darlunio(s, dtype)}
@@ -0,0 +1,135 @@
+# mynegai_clecs.py
+'''
+Mynegai cytseinedd a thudalennau ar gyfer /cleciadur.
+
+Mae `mynegai()` yn cael ei adeiladu unwaith i bob proses o eiriau'r
+geiriadur (`geiriadur.geiriau()`): cytseiniaid pob gair cyn ei lafariad
+acennog (`geiriadur.sgerbwd`) -> geiriau. Mae ymholiad yn chwilio ei
+sgerbwd ei hun yn y mynegai, ac yn hidlo'r ychydig ymgeiswyr i'r pedwar
+dosbarth yn ôl yr acenion:
+
+    CAC  y ddau'n acennog
+    CDI  y ddau'n ddiacen
+    ADI  ymholiad acennog, gair diacen
+    AAC  ymholiad diacen, gair acennog
+
+Os yw un o'r ddau'n ddiacen, rhaid i'r cytseiniaid ar ôl y llafariaid
+acennog ateb hefyd. Heb eiriadur mae `clec_search()` yn sganio fel cynt
+(gyda'r ymholiad gwreiddiol). Mae'r canlyniadau'n cael eu cadw mewn
+`StorfaLRU` ar gyfer ymholiadau cyffredin.
+
+Dim ond y `terfyn` gair cyntaf ym mhob dosbarth sy'n mynd i'r dudalen;
+mae'r gweddill yn dod fesul tudalen o `tudalen()` (/api/cleciadur).
+'''
+
+import threading
+
+from ceibwr.cleciadur import clec_search
+
+from . import geiriadur
+from .storfa import StorfaLRU, allwedd, tudalennu
+from .settings import (
+    CLECIADUR_STORFA_MAINT,
+    CLECIADUR_TERFYN,
+    CLECIADUR_TUDALEN_UCHAFSWM,
+)
+
+
+DOSBARTHIADAU = ('CAC', 'CDI', 'ADI', 'AAC')
+
+storfa = StorfaLRU(maint=CLECIADUR_STORFA_MAINT, ttl=None)
+
+_lock = threading.Lock()
+_mynegai = None
+
+
+def mynegai():
+    '''
+    {blaen: [(gair, acennog, wedyn), ...]} dros y geiriadur (gweler
+    `geiriadur.sgerbwd`), wedi'i adeiladu y tro cyntaf.
+    '''
+    global _mynegai
+    with _lock:
+        if _mynegai is None:
+            mynegai = {}
+            for gair in geiriadur.geiriau():
+                sgerbwd = geiriadur.sgerbwd(gair)
+                if sgerbwd is None:
+                    continue
+                blaen, acennog, wedyn = sgerbwd
+                mynegai.setdefault(blaen, []).append((gair, acennog, wedyn))
+            _mynegai = mynegai
+        return _mynegai
+
+
+def _clecs(ymholiad):
+    # chwilio'r mynegai a hidlo'r ymgeiswyr
+    clecs = {dosbarth: [] for dosbarth in DOSBARTHIADAU}
+    sgerbwd = geiriadur.sgerbwd(ymholiad)
+    if sgerbwd is None:
+        return clecs
+    blaen, acennog, wedyn = sgerbwd
+    ymholiad = allwedd(ymholiad)
+
+    for gair, gair_acennog, gair_wedyn in mynegai().get(blaen, ()):
+        if gair.lower() == ymholiad:
+            continue
+        if not (acennog and gair_acennog) and gair_wedyn != wedyn:
+            continue
+        if acennog:
+            dosbarth = 'CAC' if gair_acennog else 'ADI'
+        else:
+            dosbarth = 'AAC' if gair_acennog else 'CDI'
+        clecs[dosbarth].append(gair)
+    return clecs
+
+
+def chwilio(ymholiad):
+    '''
+    Clecs `ymholiad`: {dosbarth: (gair, ...)}.
+    '''
+    key = allwedd(ymholiad)
+    if not key:
+        return {}
+
+    clecs = storfa.get(key)
+    if clecs is None:
+        if mynegai():
+            clecs = _clecs(ymholiad)
+        else:
+            clecs = clec_search(ymholiad)
+        clecs = {dosbarth: tuple(geiriau) for dosbarth, geiriau in clecs.items()}
+        storfa.set(key, clecs)
+    return clecs
+
+
+def crynodeb(ymholiad, terfyn=CLECIADUR_TERFYN):
+    '''
+    Y `terfyn` gair cyntaf ym mhob dosbarth a chyfanswm pob dosbarth.
+    '''
+    clecs = chwilio(ymholiad)
+    return {
+        'ymholiad': allwedd(ymholiad),
+        'terfyn': terfyn,
+        'clecs': {dosbarth: geiriau[:terfyn] for dosbarth, geiriau in clecs.items()},
+        'cyfanswm': {dosbarth: len(geiriau) for dosbarth, geiriau in clecs.items()},
+    }
+
+
+def tudalen(ymholiad, dosbarth, rhif=1, maint=CLECIADUR_TERFYN):
+    '''
+    Un dudalen (rhif o 1) o eiriau un dosbarth ar gyfer yr API JSON.
+    '''
+    canlyniad = tudalennu(chwilio(ymholiad).get(dosbarth, ()), rhif, maint, CLECIADUR_TUDALEN_UCHAFSWM, 'geiriau')
+    canlyniad.update(ymholiad=allwedd(ymholiad), dosbarth=dosbarth)
+    return canlyniad
+
+
+def ystadegau():
+    with _lock:
+        allweddi = len(_mynegai) if _mynegai is not None else None
+    return {
+        'geiriau': len(geiriadur.geiriau()),
+        'allweddi': allweddi,
+        'storfa': storfa.ystadegau(),
+    }
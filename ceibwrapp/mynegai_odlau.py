@@ -0,0 +1,105 @@
+# mynegai_odlau.py
+'''
+Mynegai odlau ar gyfer /odliadur.
+
+Mae `mynegai()` yn cael ei adeiladu unwaith i bob proses o eiriau'r
+geiriadur (`geiriadur.geiriau()`), gydag odl pob gair (llafariaid y
+sillaf olaf a'r cytseiniaid ar ei hôl, `geiriadur.odlau`) yn allwedd:
+
+    'olaf':    {odl: (gair, ...)}   pob gair
+    'acennog': {odl: (gair, ...)}   geiriau unsill yn unig
+    'llusg':   {odl: (gair, ...)}   geiriau lle mae'r odl yn y goben
+
+felly mae ymholiad yn ddim mwy na chwilio mewn `dict` (a chyfuno'r
+odlau llusg os oes eisiau). Heb eiriadur mae `odl_search()` yn sganio fel
+cynt, gyda'r canlyniadau mewn `StorfaLRU`.
+'''
+
+import threading
+
+from ceibwr.odliadur import odl_search
+
+from . import geiriadur
+from .storfa import StorfaLRU, allwedd, tudalennu
+from .settings import (
+    ODLIADUR_STORFA_MAINT,
+    ODLIADUR_TUDALEN,
+    ODLIADUR_TUDALEN_UCHAFSWM,
+)
+
+
+_lock = threading.Lock()
+_mynegai = None
+
+# heb eiriadur
+storfa = StorfaLRU(maint=ODLIADUR_STORFA_MAINT, ttl=None)
+
+
+def mynegai():
+    '''
+    Y mynegai (gweler uchod), wedi'i adeiladu y tro cyntaf. `None` os nad
+    oes geiriadur.
+    '''
+    global _mynegai
+    with _lock:
+        if _mynegai is None:
+            geiriau = geiriadur.geiriau()
+            if not geiriau:
+                return None
+            mynegai = {'olaf': {}, 'acennog': {}, 'llusg': {}}
+            for gair in geiriau:
+                olaf, goben, nifer = geiriadur.odlau(gair)
+                if olaf is None:
+                    continue
+                mynegai['olaf'].setdefault(olaf, []).append(gair)
+                if nifer == 1:
+                    mynegai['acennog'].setdefault(olaf, []).append(gair)
+                if goben:
+                    mynegai['llusg'].setdefault(goben, []).append(gair)
+            _mynegai = {
+                key: {odl: tuple(geiriau_) for odl, geiriau_ in odlau.items()}
+                for key, odlau in mynegai.items()
+            }
+        return _mynegai
+
+
+def chwilio(sillaf, acennog=False, llusg=False):
+    '''
+    Odlau `sillaf` (fel `odl_search`, ond fel `tuple`).
+    '''
+    key = (allwedd(sillaf), bool(acennog), bool(llusg))
+    if not key[0]:
+        return ()
+
+    myn = mynegai()
+    if myn is None:
+        odlau = storfa.get(key)
+        if odlau is None:
+            odlau = tuple(odl_search(sillaf, acennog=acennog, llusg=llusg))
+            storfa.set(key, odlau)
+        return odlau
+
+    odl = geiriadur.odlau(sillaf)[0]
+    odlau = myn['acennog' if acennog else 'olaf'].get(odl, ())
+    if llusg:
+        odlau += myn['llusg'].get(odl, ())
+    return odlau
+
+
+def tudalen(sillaf, acennog=False, llusg=False, rhif=1, maint=ODLIADUR_TUDALEN):
+    '''
+    Un dudalen o `chwilio()` (rhif o 1) ar gyfer yr API JSON.
+    '''
+    canlyniad = tudalennu(chwilio(sillaf, acennog, llusg), rhif, maint, ODLIADUR_TUDALEN_UCHAFSWM, 'odlau')
+    canlyniad.update(sillaf=allwedd(sillaf), acennog=bool(acennog), llusg=bool(llusg))
+    return canlyniad
+
+
+def ystadegau():
+    with _lock:
+        myn = _mynegai
+    return {
+        'geiriau': len(geiriadur.geiriau()),
+        'allweddi': {key: len(odlau) for key, odlau in myn.items()} if myn else None,
+        'storfa': storfa.ystadegau(),
+    }
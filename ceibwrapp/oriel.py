@@ -0,0 +1,210 @@
+# oriel.py
+'''
+Storfa darluniau /darlunio.
+
+Mae enw pob darlun yn hash o'r testun (wedi'i normaleiddio), y math o
+ddarlun, `ndots` a DARLUN_FERSIWN, felly mae'r un gerdd yn rhoi'r un
+darlun bob tro. Os yw'r darlun yn bodoli yn barod does dim angen datrys
+na chyffwrdd â matplotlib.
+
+Dau fodd (DARLUN_MODD):
+
+    'ffeil': `darlunio()` -> ffeil yn TMP_FOLDER. Mae `tocio()` yn cadw
+             cyfanswm maint y ffolder o dan TMP_UCHAFSWM drwy ddileu'r
+             ffeiliau a ddefnyddiwyd leiaf yn ddiweddar (mtime, sy'n cael
+             ei ddiweddaru ar bob hit).
+    'cof':   `darlunio_cof()` -> beit mewn `StorfaLRU`, heb ysgrifennu
+             dim i'r ddisg. Mae'r ap yn eu gosod yn y dudalen (data URI),
+             gan gynnwys canlyniadau tasgau o'r gweithwyr, gan mai dim ond
+             y broses a'u creodd sydd â nhw yn ei storfa.
+
+Mae `graff()` yn hepgor matplotlib yn gyfan gwbl: dim ond y graff cryno
+(`cyfresu.graff`) sy'n cael ei anfon, ac mae `static/js/olwyn.js` yn ei
+ddarlunio yn y porwr.
+'''
+
+import io
+import os
+import uuid
+import base64
+import hashlib
+import threading
+
+from .storfa import StorfaLRU, normaleiddio
+from .peiriannau import peiriant
+from .cyfresu import graff as _graff
+from .settings import (
+    TMP_FOLDER,
+    TMP_UCHAFSWM,
+    DARLUN_FERSIWN,
+    DARLUN_FFORMAT,
+    DARLUN_STORFA_MAINT,
+    DARLUN_STORFA_TTL,
+)
+
+
+# ndots i bob math o ddarlun
+NDOTS = {
+    'hyperbolic': 100,
+    'complex': 500,
+}
+
+MIMETYPES = {
+    'svg': 'image/svg+xml',
+    'png': 'image/png',
+}
+
+_lock = threading.Lock()
+_ystadegau = {
+    'hits': 0,
+    'misses': 0,
+    'dileu': 0,
+}
+
+storfa = StorfaLRU(maint=DARLUN_STORFA_MAINT, ttl=DARLUN_STORFA_TTL)
+storfa_graff = StorfaLRU(maint=DARLUN_STORFA_MAINT, ttl=DARLUN_STORFA_TTL)
+
+
+def enw_ffeil(s, dtype='hyperbolic', ndots=None, fformat=DARLUN_FFORMAT):
+    '''
+    Enw ffeil y darlun: 'olwyn-<dtype>-<hash>.<fformat>'.
+    '''
+    if ndots is None:
+        ndots = NDOTS[dtype]
+    allwedd = '\0'.join([normaleiddio(s), dtype, str(ndots), str(DARLUN_FERSIWN)])
+    return 'olwyn-{}-{}.{}'.format(dtype, hashlib.sha256(allwedd.encode('utf-8')).hexdigest()[:32], fformat)
+
+
+def _datrys(s):
+    with peiriant() as pe:
+        meta, uned = pe.parse(s)
+        dat = pe.datryswr(uned)
+        dat.set_nbrs()
+    return dat
+
+
+def darlunio_cof(s, dtype='hyperbolic', fformat=DARLUN_FFORMAT):
+    '''
+    (enw, beit) darlun `s`, o'r storfa neu wedi'i greu mewn `BytesIO`.
+    '''
+    ndots = NDOTS[dtype]
+    fname = enw_ffeil(s, dtype, ndots, fformat)
+    data = storfa.get(fname)
+    if data is not None:
+        return fname, data
+
+    from .darlun import plot
+
+    dat = _datrys(s)
+    allbwn = io.BytesIO()
+    plot(dat, hyperbolic=(dtype == 'hyperbolic'), ndots=ndots, allbwn=allbwn, fformat=fformat)
+    data = allbwn.getvalue()
+    storfa.set(fname, data)
+    return fname, data
+
+
+def graff(s):
+    '''
+    Graff cryno `s` (gweler `cyfresu.graff`), o'r storfa os yn bosib.
+    '''
+    allwedd = normaleiddio(s)
+    canlyniad = storfa_graff.get(allwedd)
+    if canlyniad is None:
+        canlyniad = _graff(_datrys(s))
+        storfa_graff.set(allwedd, canlyniad)
+    return canlyniad
+
+
+def mimetype(fname):
+    return MIMETYPES.get(fname.rsplit('.', 1)[-1], 'application/octet-stream')
+
+
+def data_uri(fname, data):
+    '''
+    Darlun fel `data:` URI, i'w osod yn syth yn y dudalen.
+    '''
+    return 'data:{};base64,{}'.format(mimetype(fname), base64.b64encode(data).decode('ascii'))
+
+
+def darlunio(s, dtype='hyperbolic'):
+    '''
+    Enw ffeil darlun `s` yn TMP_FOLDER (yn ei greu os nad yw'n bodoli).
+    '''
+    ndots = NDOTS[dtype]
+    fname = enw_ffeil(s, dtype, ndots)
+    fname_fullpath = os.path.join(TMP_FOLDER, fname)
+
+    try:
+        os.utime(fname_fullpath)
+        with _lock:
+            _ystadegau['hits'] += 1
+        return fname
+    except FileNotFoundError:
+        pass
+
+    from .darlun import plot
+
+    dat = _datrys(s)
+
+    # ysgrifennu i ffeil dros dro ac yna ailenwi, fel nad oes neb yn
+    # gweld ffeil hanner ffordd
+    os.makedirs(TMP_FOLDER, exist_ok=True)
+    tmp = '.{}-{}'.format(uuid.uuid4().hex, fname)
+    try:
+        plot(dat, hyperbolic=(dtype == 'hyperbolic'), ndots=ndots, fname=tmp, fformat=DARLUN_FFORMAT)
+        os.replace(os.path.join(TMP_FOLDER, tmp), fname_fullpath)
+    finally:
+        if os.path.exists(os.path.join(TMP_FOLDER, tmp)):
+            os.remove(os.path.join(TMP_FOLDER, tmp))
+
+    with _lock:
+        _ystadegau['misses'] += 1
+    tocio()
+    return fname
+
+
+def _ffeiliau():
+    ffeiliau = []
+    with os.scandir(TMP_FOLDER) as it:
+        for entry in it:
+            if entry.name.startswith('olwyn-') and entry.is_file():
+                stat = entry.stat()
+                ffeiliau.append((stat.st_mtime, stat.st_size, entry.path))
+    return ffeiliau
+
+
+def tocio(uchafswm=TMP_UCHAFSWM):
+    '''
+    Dileu'r darluniau hynaf (LRU) nes bod cyfanswm eu maint yn llai na
+    `uchafswm` beit. Dychwelyd nifer y ffeiliau a ddilewyd.
+    '''
+    with _lock:
+        ffeiliau = sorted(_ffeiliau())
+        cyfanswm = sum(maint for _, maint, _ in ffeiliau)
+        dileu = 0
+        for _, maint, path in ffeiliau:
+            if cyfanswm <= uchafswm:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            cyfanswm -= maint
+            dileu += 1
+        _ystadegau['dileu'] += dileu
+    return dileu
+
+
+def ystadegau():
+    with _lock:
+        ystadegau = dict(_ystadegau)
+    try:
+        ffeiliau = _ffeiliau()
+    except FileNotFoundError:
+        ffeiliau = []
+    ystadegau['ffeiliau'] = len(ffeiliau)
+    ystadegau['maint'] = sum(maint for _, maint, _ in ffeiliau)
+    ystadegau['uchafswm'] = TMP_UCHAFSWM
+    ystadegau['cof'] = storfa.ystadegau()
+    ystadegau['graff'] = storfa_graff.ystadegau()
+    return ystadegau
@@ -0,0 +1,87 @@
+# peiriannau.py
+'''
+Cronfa o wrthrychau `Peiriant` wedi'u cynhesu.
+
+Yn lle creu `Peiriant()` newydd ym mhob cais, mae `peiriant()` yn
+benthyg un sy'n segur (neu'n creu un os nad oes un ar gael) ac yn ei
+roi yn ôl ar y diwedd. Dim ond un edefyn sy'n defnyddio pob un ar y tro.
+
+    with peiriant() as pe:
+        meta, uned = pe.parse(s)
+'''
+
+import time
+import threading
+from contextlib import contextmanager
+
+from ceibwr.peiriant import Peiriant
+
+
+ENGHRAIFFT = "Ochain cloch a chanu clir"
+
+_segur = []
+_lock = threading.Lock()
+_ystadegau = {
+    'creu': 0,
+    'benthyg': 0,
+    'amser_creu': 0.0,
+    'amser_cynhesu': None,
+}
+
+
+def _creu():
+    t0 = time.perf_counter()
+    pe = Peiriant()
+    dt = time.perf_counter() - t0
+    with _lock:
+        _ystadegau['creu'] += 1
+        _ystadegau['amser_creu'] += dt
+    return pe
+
+
+@contextmanager
+def peiriant():
+    with _lock:
+        _ystadegau['benthyg'] += 1
+        pe = _segur.pop() if _segur else None
+    if pe is None:
+        pe = _creu()
+    try:
+        yield pe
+    finally:
+        with _lock:
+            _segur.append(pe)
+
+
+def cynhesu(nifer=1, s=ENGHRAIFFT):
+    '''
+    Creu `nifer` peiriant a datrys llinell enghreifftiol gyda phob un, fel
+    nad yw'r defnyddiwr cyntaf yn talu'r gost.
+    '''
+    t0 = time.perf_counter()
+    peiriannau = [_creu() for _ in range(nifer)]
+    for pe in peiriannau:
+        try:
+            meta, uned = pe.parse(s)
+            dat = pe.datryswr(uned)
+            dat.set_nbrs()
+        except Exception as err:
+            print('CYNHESU:', type(err).__name__, err)
+    with _lock:
+        _segur.extend(peiriannau)
+        _ystadegau['amser_cynhesu'] = time.perf_counter() - t0
+
+
+def ystadegau():
+    '''
+    Faint o weithiau y cafodd `Peiriant` ei greu a'i fenthyg, a faint o
+    amser creu a arbedwyd (benthyg heb greu x amser creu cyfartalog).
+    '''
+    with _lock:
+        ystadegau = dict(_ystadegau)
+        ystadegau['segur'] = len(_segur)
+    creu = ystadegau['creu']
+    cyfartaledd = ystadegau['amser_creu']/creu if creu else 0.0
+    ystadegau['amser_creu_cyfartalog'] = cyfartaledd
+    ystadegau['arbedwyd'] = max(ystadegau['benthyg'] - creu, 0)*cyfartaledd
+    return ystadegau
@@ -8,7 +8,67 @@ CERDDI_FOLDER = os.path.join(os.path.dirname(PROJECT_FOLDER), 'cerddi/Uchelwyr')
 # CERDDI_FOLDER = os.path.join(os.path.dirname(PROJECT_FOLDER), 'cerddi/test')
 STATIC_FOLDER = os.path.join(SRC_FOLDER, 'static')
 MEFUS_FOLDER = os.path.join(STATIC_FOLDER, 'mefus')
+MEFUS_MANIFEST = os.path.join(MEFUS_FOLDER, '.manifest.json')
+MEFUS_MYNEGAI = os.path.join(MEFUS_FOLDER, '.mynegai.json')  # gweler `corpws.py`
+COLOFNAU_FOLDER = os.path.join(MEFUS_FOLDER, '.colofnau')  # gweler `colofnau.py`
+MEFUS_CYFRIFON = os.path.join(MEFUS_FOLDER, '.cyfrifon.json')  # gweler `cyfrifon.py`
+MEFUS_PROSESAU = int(os.environ.get('MEFUS_PROSESAU', os.cpu_count() or 1))
+MEFUS_CYFNOD = 10  # eiliadau rhwng gwirio CERDDI_FOLDER
+MEFUS_AMDDIFAID = os.path.join(MEFUS_FOLDER, '.amddifaid.json')  # hen allbynnau i'w dileu
+MEFUS_CADW = 30*MEFUS_CYFNOD  # eiliadau cyn dileu hen allbwn (mae prosesau eraill yn dal i'w weini)
 UPLOAD_FOLDER = os.path.join(STATIC_FOLDER, 'uploads')
 TMP_FOLDER = os.path.join(STATIC_FOLDER, 'tmp')
 ALLOWED_EXTENSIONS = {'txt'}
 
+# storfeydd
+DATRYS_STORFA_MAINT = 256  # nifer datrysiadau
+DATRYS_STORFA_TTL = 3600  # eiliadau
+CERDDI_STORFA_MAINT = 64  # nifer cerddi (/cerddi/<slug>)
+
+# nifer `Peiriant` i'w cynhesu wrth gychwyn
+PEIRIANNAU_CYNHESU = int(os.environ.get('PEIRIANNAU_CYNHESU', 1))
+
+# prosesau gweithwyr yr ap (gweler `gweithwyr.py`)
+GWEITHWYR_PROSESAU = int(os.environ.get('GWEITHWYR_PROSESAU', os.cpu_count() or 1))
+GWEITHWYR_GRAS = 5  # eiliadau ar ôl `terfyn` cyn lladd gweithiwr sownd
+GWEITHWYR_POLL = 0.5  # eiliadau rhwng gwirio pa eitemau sydd wedi cychwyn
+
+# /pysgota: nifer geiriau i bob darn
+PYSGOTA_DARN = 200
+PYSGOTA_AR_WAITH = max(GWEITHWYR_PROSESAU//2, 1)  # darnau un testun yn y gronfa ar y tro
+
+# ciw tasgau (gweler `tasgau.py`)
+TASGAU_CIW = 64  # uchafswm tasgau'n aros
+TASGAU_EDAFEDD = GWEITHWYR_PROSESAU
+TASGAU_TTL = 600  # eiliadau i gadw canlyniad
+TASGAU_TERFYN = 300  # eiliadau i bob tasg (o'r adeg y mae gweithiwr yn ei chodi)
+
+# /api/datrys
+API_TERFYN = 30  # eiliadau i bob eitem (uchafswm)
+API_UCHAFSWM = 10000  # eitemau i bob cais
+
+# /darlunio (gweler `oriel.py`)
+DARLUN_MODD = os.environ.get('DARLUN_MODD', 'cof')  # 'cof' (BytesIO + storfa) neu 'ffeil' (TMP_FOLDER)
+DARLUN_FFORMAT = os.environ.get('DARLUN_FFORMAT', 'svg')  # 'svg' neu 'png'
+DARLUN_STORFA_MAINT = 128  # nifer darluniau yn y cof
+DARLUN_STORFA_TTL = 3600  # eiliadau
+TMP_UCHAFSWM = 64*1024*1024  # beit yn TMP_FOLDER
+DARLUN_FERSIWN = 1  # newid hwn os yw allbwn `darlun.py` yn newid
+DARLUN_RHAGLWYTHO = bool(int(os.environ.get('DARLUN_RHAGLWYTHO', 0)))  # mewnforio matplotlib/geomstats wrth gychwyn
+
+# geiriadur yr odliadur a'r cleciadur (gweler `geiriadur.py`): un gair i bob llinell
+GEIRIADUR_FFEIL = os.environ.get('GEIRIADUR_FFEIL', os.path.join(PROJECT_FOLDER, 'geiriadur.txt'))
+
+# /odliadur (gweler `mynegai_odlau.py`)
+ODLIADUR_STORFA_MAINT = 1024  # ymholiadau (heb eiriadur yn unig)
+ODLIADUR_TUDALEN = 200  # odlau i bob tudalen (JSON)
+ODLIADUR_TUDALEN_UCHAFSWM = 2000
+
+# /cleciadur (gweler `mynegai_clecs.py`)
+CLECIADUR_STORFA_MAINT = 512  # nifer ymholiadau (canlyniadau wedi'u hidlo)
+CLECIADUR_TERFYN = 100  # geiriau i bob dosbarth ar y dudalen (a phob tudalen JSON)
+CLECIADUR_TUDALEN_UCHAFSWM = 1000
+
+# /corpws (gweler `corpws.py`)
+CORPWS_TERFYN = 100  # llinellau i bob tudalen
+CORPWS_TUDALEN_UCHAFSWM = 1000
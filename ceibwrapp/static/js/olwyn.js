@@ -0,0 +1,99 @@
+// olwyn.js
+//
+// Darlunio graff cryno'r olwyn (gweler `cyfresu.graff`) yn SVG yn y
+// porwr: yr un geometreg a `darlun.plot_complex`, ond mae pob arc yn un
+// elfen <path> (arc crwn sy'n orthogonal i'r cylch) yn lle cannoedd o
+// bwyntiau.
+//
+//     olwyn(document.getElementById('olwyn'), graff)
+
+(function () {
+
+  const SVGNS = 'http://www.w3.org/2000/svg';
+
+  // lliwiau arferol matplotlib (C0 ... C9)
+  const LLIWIAU = [
+    '#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',
+    '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf',
+  ];
+
+  function elfen(enw, priodweddau) {
+    const el = document.createElementNS(SVGNS, enw);
+    for (const [key, value] of Object.entries(priodweddau)) {
+      el.setAttribute(key, value);
+    }
+    return el;
+  }
+
+  // arc (geodesic y Poincaré disc) rhwng dau bwynt ar y cylch
+  function arc(a, b) {
+    const [x1, y1] = [Math.cos(a), -Math.sin(a)];
+    const [x2, y2] = [Math.cos(b), -Math.sin(b)];
+    const h = (a - b) / 2;
+    if (Math.abs(Math.cos(h)) < 1e-9) {
+      // diametr
+      return `M ${x1} ${y1} L ${x2} ${y2}`;
+    }
+    const r = Math.abs(Math.tan(h));
+    // ochr yr arc: tuag at y canol
+    const m = (a + b) / 2;
+    const [cx, cy] = [Math.cos(m) / Math.cos(h), -Math.sin(m) / Math.cos(h)];
+    const d = Math.hypot(cx, cy);
+    const [mx, my] = [cx - r * cx / d, cy - r * cy / d];
+    const cross = (x2 - x1) * (my - y1) - (y2 - y1) * (mx - x1);
+    const sweep = cross < 0 ? 1 : 0;
+    return `M ${x1} ${y1} A ${r} ${r} 0 0 ${sweep} ${x2} ${y2}`;
+  }
+
+  function olwyn(svg, graff) {
+    const nodau = graff.nodau;
+    const N = nodau.length;
+    while (svg.firstChild) {
+      svg.removeChild(svg.firstChild);
+    }
+    svg.setAttribute('viewBox', '-1.2 -1.2 2.4 2.4');
+    if (N === 0) {
+      return;
+    }
+
+    // theta: o pi i -pi (clocwedd), fel `np.linspace`
+    const theta = nodau.map((_, idx) => N > 1 ? Math.PI - 2 * Math.PI * idx / (N - 1) : Math.PI);
+
+    // rim & spokes
+    const llinell = {stroke: '#ccc', 'stroke-width': 0.005, 'stroke-dasharray': '0.03 0.015', fill: 'none'};
+    svg.appendChild(elfen('circle', Object.assign({cx: 0, cy: 0, r: 1}, llinell)));
+    for (const idx of graff.toriadau) {
+      const t = theta[idx];
+      svg.appendChild(elfen('line', Object.assign({x1: 0, y1: 0, x2: Math.cos(t), y2: -Math.sin(t)}, llinell)));
+    }
+
+    // ymylon (lliwiau'n dilyn ymlaen o un math i'r llall)
+    let lliw = 0;
+    for (const math of ['cytseinedd', 'odlau']) {
+      const g = elfen('g', {class: 'olwyn-' + math, fill: 'none', 'stroke-width': 0.01});
+      for (const [idx, idx_nbr] of graff.ymylon[math] || []) {
+        const path = elfen('path', {d: arc(theta[idx], theta[idx_nbr]), stroke: LLIWIAU[lliw % 10]});
+        const title = elfen('title', {});
+        title.textContent = `${nodau[idx]} - ${nodau[idx_nbr]}`;
+        path.appendChild(title);
+        g.appendChild(path);
+        lliw += 1;
+      }
+      svg.appendChild(g);
+    }
+
+    // olwyn nodau
+    const g = elfen('g', {'font-family': 'monospace', 'font-size': 0.06, 'text-anchor': 'middle', 'dominant-baseline': 'central', fill: 'currentColor'});
+    nodau.forEach((nod, idx) => {
+      const t = theta[idx];
+      const [x, y] = [1.05 * Math.cos(t), -1.05 * Math.sin(t)];
+      const text = elfen('text', {x: x, y: y, transform: `rotate(${-(t - Math.PI / 2) * 180 / Math.PI} ${x} ${y})`});
+      text.textContent = nod;
+      g.appendChild(text);
+    });
+    svg.appendChild(g);
+  }
+
+  window.olwyn = olwyn;
+
+})();
@@ -0,0 +1,134 @@
+# storfa.py
+'''
+Storfa LRU fach (maint + TTL) ar gyfer canlyniadau drud, a'r darnau sy'n
+gyffredin i'r mynegeion: allweddi ymholiad, tudalennau, ysgrifennu
+ffeiliau'n atomig a chiplun o ffeil sy'n cael ei ail-ddarllen pan fo'n
+newid.
+'''
+
+import os
+import time
+import threading
+from collections import OrderedDict
+
+
+def normaleiddio(s):
+    '''
+    Allwedd ar gyfer testun mewnbwn: dim gofod gwyn ychwanegol ar
+    ddechrau/diwedd llinellau na rhwng geiriau, a `\\n` yn unig.
+    '''
+    llinellau = [' '.join(ll.split()) for ll in s.strip().splitlines()]
+    return '\n'.join(llinellau)
+
+
+def allwedd(ymholiad):
+    '''
+    Allwedd ymholiad: llythrennau bach, dim gofod gwyn ychwanegol.
+    '''
+    return ' '.join(ymholiad.split()).lower()
+
+
+def tudalennu(eitemau, rhif, maint, uchafswm, enw='eitemau'):
+    '''
+    Un dudalen (rhif o 1) o `eitemau`: {tudalen, maint, cyfanswm, nesaf,
+    `enw`}, gyda `maint` rhwng 1 ac `uchafswm`.
+    '''
+    rhif = max(int(rhif), 1)
+    maint = min(max(int(maint), 1), uchafswm)
+    dechrau = (rhif - 1)*maint
+    return {
+        'tudalen': rhif,
+        'maint': maint,
+        'cyfanswm': len(eitemau),
+        'nesaf': rhif + 1 if dechrau + maint < len(eitemau) else None,
+        enw: list(eitemau[dechrau:dechrau + maint]),
+    }
+
+
+def ysgrifennu(fname, data):
+    '''
+    Ysgrifennu `data` (beit) i `fname` drwy ffeil dros dro ac
+    `os.replace`, fel nad oes neb yn darllen ffeil hanner ffordd.
+    '''
+    with open(fname + '.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(fname + '.tmp', fname)
+
+
+class StorfaLRU:
+    '''
+    `dict` wedi'i gyfyngu i `maint` eitem, gyda phob eitem yn dod i ben
+    ar ôl `ttl` eiliad. Diogel rhwng edafedd.
+    '''
+
+    def __init__(self, maint=256, ttl=3600):
+        self.maint = maint
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, allwedd, default=None):
+        with self._lock:
+            eitem = self._data.get(allwedd)
+            if eitem is None or (self.ttl and time.monotonic() - eitem[0] > self.ttl):
+                if eitem is not None:
+                    del self._data[allwedd]
+                self.misses += 1
+                return default
+            self._data.move_to_end(allwedd)
+            self.hits += 1
+            return eitem[1]
+
+    def set(self, allwedd, gwerth):
+        with self._lock:
+            self._data[allwedd] = (time.monotonic(), gwerth)
+            self._data.move_to_end(allwedd)
+            while len(self._data) > self.maint:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def ystadegau(self):
+        with self._lock:
+            cyfanswm = self.hits + self.misses
+            return {
+                'maint': len(self._data),
+                'uchafswm': self.maint,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'cyfradd': self.hits/cyfanswm if cyfanswm else None,
+            }
+
+
+class Ciplun:
+    '''
+    Gwerth `llwytho()` wedi'i gadw nes bod mtime `ffeil` yn newid (gan
+    gynnwys ei chreu neu ei dileu). Diogel rhwng edafedd. Os yw
+    `llwytho()` yn codi eithriad, does dim yn cael ei gadw.
+    '''
+
+    def __init__(self, llwytho):
+        self.llwytho = llwytho
+        self._gwerth = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def get(self, ffeil):
+        try:
+            mtime = os.path.getmtime(ffeil)
+        except OSError:
+            mtime = None
+
+        with self._lock:
+            if self._gwerth is None or mtime != self._mtime:
+                self._gwerth = self.llwytho()
+                self._mtime = mtime
+            return self._gwerth
@@ -0,0 +1,182 @@
+# tasgau.py
+'''
+Ciw tasgau (datrys, pysgota, darlunio) ar gyfer gwaith hir.
+
+Mae `cyflwyno()` yn dychwelyd `id` ar unwaith; mae edafedd yn y broses
+hon yn tynnu tasgau o'r ciw ac yn anfon y gwaith trwm i'r gronfa
+`gweithwyr` (drwy `gweithwyr.swp`, gyda therfyn o TASGAU_TERFYN eiliad).
+Dim ond tasgau sy'n aros y gellir eu canslo. Mae'r ciw yn gyfyngedig (`TASGAU_CIW`): pan mae'n llawn mae
+`cyflwyno()` yn codi `queue.Full`. Dim brocer allanol.
+'''
+
+import time
+import uuid
+import queue
+import threading
+
+from . import gweithwyr
+from .settings import TASGAU_CIW, TASGAU_EDAFEDD, TASGAU_TTL, TASGAU_TERFYN
+
+
+# math: ffwythiant yn `gweithwyr` (rhaid iddo ddychwelyd JSON)
+MATHAU = {
+    'datrys': gweithwyr.datrys_json,
+    'pysgota': gweithwyr.pysgota_json,
+    'darlunio': gweithwyr.darlunio_json,
+}
+
+# statws
+AROS = 'aros'
+RHEDEG = 'rhedeg'
+GORFFEN = 'gorffen'
+GWALL = 'gwall'
+CANSLO = 'canslo'
+
+_ciw = queue.Queue(maxsize=TASGAU_CIW)
+_tasgau = {}
+_lock = threading.Lock()
+_edafedd = []
+
+
+def _cychwyn_edafedd():
+    with _lock:
+        while len(_edafedd) < TASGAU_EDAFEDD:
+            edefyn = threading.Thread(target=_gweithio, name='tasgau-{}'.format(len(_edafedd)), daemon=True)
+            edefyn.start()
+            _edafedd.append(edefyn)
+
+
+def _tacluso():
+    # hen dasgau gorffenedig
+    nawr = time.time()
+    with _lock:
+        for tid in [tid for tid, tasg in _tasgau.items() if tasg['gorffen'] and nawr - tasg['gorffen'] > TASGAU_TTL]:
+            del _tasgau[tid]
+
+
+def cyflwyno(math, mewnbwn, **kwargs):
+    '''
+    Ychwanegu tasg (`ffwythiant(mewnbwn, **kwargs)`) i'r ciw a dychwelyd ei
+    `id`. Mae'n codi `KeyError` am `math` anhysbys a `queue.Full` os yw'r
+    ciw yn llawn.
+    '''
+    ffwythiant = MATHAU[math]
+    _tacluso()
+    _cychwyn_edafedd()
+
+    tasg = {
+        'id': uuid.uuid4().hex,
+        'math': math,
+        'statws': AROS,
+        'canlyniad': None,
+        'gwall': None,
+        'creu': time.time(),
+        'dechrau': None,
+        'gorffen': None,
+        '_galwad': (ffwythiant, mewnbwn, kwargs),
+        '_event': threading.Event(),
+    }
+    with _lock:
+        _tasgau[tasg['id']] = tasg
+    try:
+        _ciw.put_nowait(tasg['id'])
+    except queue.Full:
+        with _lock:
+            del _tasgau[tasg['id']]
+        raise
+    return tasg['id']
+
+
+def _gorffen(tasg, statws, canlyniad=None, gwall=None):
+    with _lock:
+        if tasg['statws'] == CANSLO:
+            return
+        tasg.update({
+            'statws': statws,
+            'canlyniad': canlyniad,
+            'gwall': gwall,
+            'gorffen': time.time(),
+        })
+    tasg['_event'].set()
+
+
+def _gweithio():
+    while True:
+        tid = _ciw.get()
+        with _lock:
+            tasg = _tasgau.get(tid)
+            if tasg is None or tasg['statws'] != AROS:
+                continue
+            ffwythiant, mewnbwn, kwargs = tasg['_galwad']
+            tasg['statws'] = RHEDEG
+            tasg['dechrau'] = time.time()
+
+        # `swp` o un eitem: terfyn amser, a gweithiwr sownd yn cael ei ladd
+        try:
+            for _, canlyniad, gwall in gweithwyr.swp(ffwythiant, [mewnbwn], terfyn=TASGAU_TERFYN, **kwargs):
+                if gwall:
+                    _gorffen(tasg, GWALL, gwall=gwall)
+                else:
+                    _gorffen(tasg, GORFFEN, canlyniad=canlyniad)
+        except Exception as err:
+            _gorffen(tasg, GWALL, gwall='{}: {}'.format(type(err).__name__, err))
+
+
+def canslo(tid):
+    '''
+    Canslo tasg sy'n aros (mae'n cael ei hepgor). `False` os nad yw'n
+    bodoli, os yw'n rhedeg yn barod (mae TASGAU_TERFYN yn ei hatal) neu
+    os yw wedi gorffen.
+    '''
+    with _lock:
+        tasg = _tasgau.get(tid)
+        if tasg is None or tasg['statws'] != AROS:
+            return False
+        tasg.update({
+            'statws': CANSLO,
+            'gorffen': time.time(),
+        })
+    tasg['_event'].set()
+    return True
+
+
+def get(tid):
+    '''
+    Cyflwr tasg (heb y meysydd mewnol) neu `None`.
+    '''
+    with _lock:
+        tasg = _tasgau.get(tid)
+        if tasg is None:
+            return None
+        tasg = {key: value for key, value in tasg.items() if not key.startswith('_')}
+    if tasg['statws'] == AROS:
+        tasg['safle'] = _safle(tid)
+    return tasg
+
+
+def _safle(tid):
+    with _ciw.mutex:
+        ciw = list(_ciw.queue)
+    return ciw.index(tid) if tid in ciw else None
+
+
+def aros(tid, timeout=None):
+    '''
+    Aros i dasg orffen (neu `timeout`). `True` os yw wedi gorffen.
+    '''
+    with _lock:
+        tasg = _tasgau.get(tid)
+    if tasg is None:
+        return True
+    return tasg['_event'].wait(timeout)
+
+
+def ystadegau():
+    with _lock:
+        statws = [tasg['statws'] for tasg in _tasgau.values()]
+    return {
+        'ciw': _ciw.qsize(),
+        'uchafswm': TASGAU_CIW,
+        'edafedd': len(_edafedd),
+        'tasgau': {key: statws.count(key) for key in (AROS, RHEDEG, GORFFEN, GWALL, CANSLO)},
+    }
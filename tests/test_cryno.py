@@ -0,0 +1,26 @@
+import datetime
+
+import pytest
+
+pytest.importorskip('ceibwr')
+
+from ceibwrapp.cryno import PENNAWD, pacio, dadbacio  # noqa: E402
+
+
+def test_pacio_dadbacio():
+    data = {
+        'fersiwn': 1,
+        'meta': {'teitl': 'Cân', 'dyddiad': datetime.date(1936, 7, 13)},
+        'nodau': {'math': [0, 1], 'testun': ['ŵ', 'dd'], 'rhiant': [None, 0]},
+        'rhaniadau': {'3': {'lefel': 'llinell'}},
+    }
+    beit = pacio(data)
+    assert beit.startswith(PENNAWD)
+
+    disgwyl = dict(data, meta={'teitl': 'Cân', 'dyddiad': '1936-07-13'})
+    assert dadbacio(beit) == disgwyl
+
+
+def test_dadbacio_nid_cryno():
+    with pytest.raises(ValueError):
+        dadbacio(b'<xml/>')